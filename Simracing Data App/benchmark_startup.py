@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Moduły, które nie powinny być importowane przed pokazaniem okna wyboru gry
+heavy_modules = ("numpy", "pandas", "pytz", "keyring", "iracingdataapi")
+import_time_line = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def run_child():
+    started_at = float(os.environ["BENCHMARK_STARTED_AT"])
+    from PySide6.QtWidgets import QApplication
+    import main
+
+    app = QApplication([])
+    main_window = main.MainWindow()
+    main_window.show()
+    app.processEvents()
+    print(json.dumps({
+        "first_window_seconds": time.time() - started_at,
+        "heavy_modules_loaded": [name for name in heavy_modules if name in sys.modules],
+    }))
+
+
+def run_once():
+    environment = dict(os.environ, BENCHMARK_STARTED_AT=repr(time.time()))
+    environment.setdefault("QT_QPA_PLATFORM", "offscreen")
+    completed = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), env=environment,
+                               capture_output=True, text=True, check=True)
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    # -X importtime wypisuje czas własny i skumulowany w mikrosekundach; wcięcie to głębokość importu
+    top_level = {}
+    for line in completed.stderr.splitlines():
+        match = import_time_line.match(line)
+        if match and len(match.group(3)) == 1:
+            top_level[match.group(4)] = int(match.group(2)) / 1e6
+    report["imports"] = top_level
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Czas do pokazania pierwszego okna i najdroższe importy")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child()
+        return
+
+    reports = [run_once() for _ in range(args.runs)]
+    first_window = [report["first_window_seconds"] for report in reports]
+    print(f"Pierwsze okno: mediana {statistics.median(first_window) * 1000:.0f} ms, "
+          f"min {min(first_window) * 1000:.0f} ms, max {max(first_window) * 1000:.0f} ms ({args.runs} uruchomień)")
+    modules = set().union(*(report["imports"] for report in reports))
+    import_times = {name: statistics.median(report["imports"].get(name, 0.0) for report in reports) for name in modules}
+    print("Najdroższe importy (mediana, skumulowany czas):")
+    for name, seconds in sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+    loaded = sorted(set().union(*(report["heavy_modules_loaded"] for report in reports)))
+    if loaded:
+        print(f"Uwaga: przed pierwszym oknem załadowano {', '.join(loaded)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
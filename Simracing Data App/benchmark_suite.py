@@ -0,0 +1,355 @@
+import argparse
+import csv
+import functools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from simracing_core import (DataStorage, IRacingDataFetcher, IRacingDriverBatch, RaceGuideIndex, RaceResult,
+                            TimeConverter, WorldRanking)
+from tests.fakes import FakeIRacingClient, fake_session
+
+benchmarks = []
+
+
+def benchmark(name, params):
+    # Styl asv: każda funkcja to jeden pomiar, powtarzany dla każdego parametru
+    def register(function):
+        benchmarks.append((name, params, function))
+        return function
+    return register
+
+
+class Timer:
+    # Mierzy tylko blok "with timer" - przygotowanie danych w tej samej funkcji nie wlicza się do wyniku
+    def __init__(self):
+        self.elapsed = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started_at
+
+
+def race_results(count):
+    started_at = datetime(2015, 1, 1)
+    return [RaceResult(created_at=(started_at + timedelta(minutes=index)).strftime("%Y-%m-%d %H:%M:%S"),
+                       car_model=f"Car {index % 50}", track_name=f"Track {index % 30}", incidents_count=index % 7,
+                       position_in_race=index % 20 + 1, field_strength=1000 + index % 2000)
+            for index in range(count)]
+
+
+@functools.lru_cache(maxsize=None)
+def filled_database(workdir, rows):
+    # Baza do pomiarów odczytu powstaje raz na rozmiar, szybkim executemany, a nie przez mierzony zapis
+    path = os.path.join(workdir, f"filled_{rows}.db")
+    data_storage = DataStorage(path)
+    with data_storage.pool.connection() as conn, conn:
+        conn.executemany('''
+            INSERT INTO results (created_at, game, car_model, incidents_count, position_in_race, track_name,
+                                 field_strength)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((result.created_at, result.game, result.car_model, result.incidents_count, result.position_in_race,
+               result.track_name, result.field_strength) for result in race_results(rows)))
+    data_storage.close()
+    return path
+
+
+@benchmark("storage.save_to_database", (1000, 100000, 1000000))
+def save_to_database(rows, workdir, timer):
+    path = tempfile.mktemp(suffix=".db", dir=workdir)
+    data_storage = DataStorage(path)
+    data_storage.results_history = race_results(rows)[::-1]
+    with timer:
+        data_storage.save_to_database()
+    data_storage.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return rows
+
+
+@benchmark("storage.load_from_database", (1000, 100000, 1000000))
+def load_from_database(rows, workdir, timer):
+    data_storage = DataStorage(filled_database(workdir, rows))
+    data_storage.max_results_history = rows
+    with timer:
+        data_storage.load_from_database()
+    data_storage.close()
+    return len(data_storage.results_history)
+
+
+@benchmark("storage.results_pages_sorted_by_incidents", (1000, 100000))
+def results_pages_sorted(rows, workdir, timer):
+    # Dwadzieścia kolejnych stron, jak przy przewijaniu tabeli posortowanej po kolumnie innej niż id
+    data_storage = DataStorage(filled_database(workdir, rows))
+    fetched = 0
+    with timer:
+        after = None
+        for _ in range(20):
+            page = data_storage.fetch_results_page(after, 200, "incidents_count", True, "Project Cars 2")
+            if not page:
+                break
+            fetched += len(page)
+            after = (page[-1][4], page[-1][0])
+    data_storage.close()
+    return fetched
+
+
+@benchmark("iracing.recent_races_from_fake_client", (100, 10000, 100000))
+def recent_races(races, workdir, timer):
+    fetcher = IRacingDataFetcher(fake_session(races=races))
+    client = fetcher.session.get_client()
+    payload = client.stats_member_recent_races(cust_id=1)
+    client.stats_member_recent_races = lambda cust_id=None: payload
+    with timer:
+        results = fetcher.recent_races(1)
+    return len(results)
+
+
+@benchmark("iracing.race_result_from_rows", (10000, 100000))
+def race_results_from_rows(races, workdir, timer):
+    data_storage = DataStorage(os.path.join(workdir, f"iracing_{races}.db"))
+    if not data_storage.load_iracing_results(1, 1):
+        data_storage.save_iracing_results(1, IRacingDataFetcher(fake_session(races=races)).recent_races(1))
+    with timer:
+        results = data_storage.load_iracing_results(1)
+    data_storage.close()
+    return len(results)
+
+
+@benchmark("iracing.recent_races_batch_50ms", (10, 50))
+def recent_races_batch(drivers, workdir, timer):
+    batch = IRacingDriverBatch(IRacingDataFetcher(fake_session(races=100, latency=0.05)))
+    with timer:
+        results, errors = batch.fetch(range(1, drivers + 1))
+    return len(results)
+
+
+@benchmark("race_guide.format_local_batch", (1000, 50000))
+def race_guide_time_conversion(sessions, workdir, timer):
+    guide = FakeIRacingClient(sessions=sessions).season_race_guide()["sessions"]
+    time_converter = TimeConverter("Europe/Warsaw")
+    start_times = [session["start_time"] for session in guide]
+    # Pierwsze wywołanie importuje pandas i strefę czasową - to mierzy benchmark_startup.py, nie ten pomiar
+    time_converter.format_local_batch(start_times[:1])
+    with timer:
+        local_times = time_converter.format_local_batch(start_times)
+    return len(local_times)
+
+
+@benchmark("race_guide.index_build", (1000, 50000))
+def race_guide_index(sessions, workdir, timer):
+    guide = IRacingDataFetcher(fake_session(sessions=sessions)).upcoming_sessions()
+    time_converter = TimeConverter("Europe/Warsaw")
+    with timer:
+        index = RaceGuideIndex(guide, time_converter)
+        index.next_session(time.time())
+    return len(index.sessions)
+
+
+def ranking_csv(workdir, drivers):
+    path = os.path.join(workdir, f"ranking_{drivers}.csv")
+    if not os.path.exists(path):
+        generator = random.Random(drivers)
+        with open(path, "w", encoding="utf-8", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["DRIVER", "IRATING", "AVG_INC", "AVG_FINISH_POS", "LOCATION"])
+            for index in range(drivers):
+                writer.writerow([f"Driver {index:07d} Łukasz", generator.randint(0, 11000),
+                                 round(generator.uniform(0, 12), 2), round(generator.uniform(1, 30), 2), "PL"])
+    return path
+
+
+@benchmark("ranking.load_cold_cache", (10000, 400000))
+def ranking_load_cold(drivers, workdir, timer):
+    cache_dir = tempfile.mkdtemp(dir=workdir)
+    world_ranking = WorldRanking(ranking_csv(workdir, drivers), cache_dir)
+    with timer:
+        world_ranking.load()
+    return len(world_ranking)
+
+
+@benchmark("ranking.load_warm_top_100", (10000, 400000))
+def ranking_load_warm(drivers, workdir, timer):
+    csv_path = ranking_csv(workdir, drivers)
+    cache_dir = os.path.join(workdir, f"ranking_{drivers}.cache")
+    WorldRanking(csv_path, cache_dir).load()
+    world_ranking = WorldRanking(csv_path, cache_dir)
+    with timer:
+        world_ranking.load()
+        top = world_ranking.top(100)
+    return len(top)
+
+
+@benchmark("ranking.select_search_sorted", (10000, 400000))
+def ranking_select(drivers, workdir, timer):
+    csv_path = ranking_csv(workdir, drivers)
+    world_ranking = WorldRanking(csv_path, os.path.join(workdir, f"ranking_{drivers}.cache"))
+    world_ranking.load()
+    with timer:
+        selection = world_ranking.select(search="driver 00", substring=True, min_irating=1500, sort_by="AVG_INC")
+    return len(selection)
+
+
+@functools.lru_cache(maxsize=None)
+def qt_application():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def process_events_until(app, condition, timeout=10.0):
+    # Część pracy widoku (opóźniony układ, fetchMore) dzieje się w pętli zdarzeń - czekamy aż faktycznie się wykona
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        app.processEvents()
+
+
+@benchmark("qt.results_table_population", (1000, 100000))
+def results_table_population(rows, workdir, timer):
+    app = qt_application()
+    import main
+    data_storage = DataStorage(filled_database(workdir, rows))
+    with timer:
+        view = main.create_results_view(data_storage, "Project Cars 2")
+        view.resize(600, 700)
+        view.show()
+        process_events_until(app, lambda: view.model().rowCount() > 0)
+        view.viewport().grab()
+    view.close()
+    data_storage.close()
+    return view.model().rowCount()
+
+
+@benchmark("qt.record_table_population", (100, 10000))
+def record_table_population(races, workdir, timer):
+    app = qt_application()
+    import main
+    results = IRacingDataFetcher(fake_session(races=races)).recent_races(1)
+    view = main.create_record_view([
+        ("Series", lambda result: result.series_name),
+        ("Car Model", lambda result: result.car_name),
+        ("Track", lambda result: result.track_name),
+        ("Finish Position", lambda result: result.finish_position),
+        ("Incidents", lambda result: result.incidents_count),
+        ("Strength of Field", lambda result: result.strength_of_field),
+    ])
+    view.resize(900, 700)
+    view.show()
+    with timer:
+        view.model().set_records(results)
+        app.processEvents()
+        view.viewport().grab()
+    view.close()
+    return len(results)
+
+
+@benchmark("qt.world_ranking_table_population", (10000, 400000))
+def world_ranking_table_population(drivers, workdir, timer):
+    app = qt_application()
+    import main
+    world_ranking = WorldRanking(ranking_csv(workdir, drivers), os.path.join(workdir, f"ranking_{drivers}.cache"))
+    world_ranking.load()
+    browser = main.WorldRankingBrowser(world_ranking)
+    browser.resize(700, 700)
+    browser.show()
+    with timer:
+        browser.apply_filters()
+        app.processEvents()
+        browser.table_view.viewport().grab()
+    browser.close()
+    return browser.table_view.model().rowCount()
+
+
+def run_benchmarks(selected, sizes, repeat, workdir):
+    report = {}
+    for name, params, function in selected:
+        for param in params:
+            if sizes and param not in sizes:
+                continue
+            # Pomiary na milionie wierszy trwają długo - wystarczy jedno powtórzenie
+            repetitions = 1 if param >= 1000000 else repeat
+            times = []
+            rows = None
+            for _ in range(repetitions):
+                timer = Timer()
+                rows = function(param, workdir, timer)
+                times.append(timer.elapsed)
+            key = f"{name}[{param}]"
+            report[key] = {"param": param, "rows": rows, "times": times, "min": min(times),
+                           "median": statistics.median(times)}
+            print(f"{key:55s} {statistics.median(times) * 1000:10.1f} ms  ({rows} wierszy)", flush=True)
+    return report
+
+
+def compare(report, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["benchmarks"]
+    regressions = []
+    print(f"\nPorównanie z {baseline_path} (próg {threshold:.2f}x):")
+    for key, result in report.items():
+        if key not in baseline:
+            continue
+        ratio = result["median"] / baseline[key]["median"]
+        marker = "  REGRESJA" if ratio > threshold else ""
+        print(f"{key:55s} {baseline[key]['median'] * 1000:10.1f} -> {result['median'] * 1000:10.1f} ms "
+              f"({ratio:.2f}x){marker}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomiary wydajności zapisu, odczytu, parsowania, rankingu i tabel")
+    parser.add_argument("--filter", help="uruchom tylko pomiary, których nazwa zawiera ten tekst")
+    parser.add_argument("--sizes", help="rozmiary oddzielone przecinkami, np. 1000,100000 (domyślnie wszystkie)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="plik JSON z poprzedniego uruchomienia do porównania")
+    parser.add_argument("--threshold", type=float, default=1.2, help="od jakiego spowolnienia zgłaszać regresję")
+    parser.add_argument("--list", action="store_true", help="wypisz dostępne pomiary")
+    args = parser.parse_args()
+
+    selected = [entry for entry in benchmarks if not args.filter or args.filter in entry[0]]
+    if args.list:
+        for name, params, _ in selected:
+            print(f"{name} {list(params)}")
+        return
+    sizes = {int(size) for size in args.sizes.split(",")} if args.sizes else None
+    with tempfile.TemporaryDirectory(prefix="simracing-benchmarks-") as workdir:
+        report = run_benchmarks(selected, sizes, args.repeat, workdir)
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump({
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "benchmarks": report,
+        }, output, indent=2)
+    print(f"Wyniki zapisane w {args.output}")
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
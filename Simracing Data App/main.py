@@ -1,68 +1,170 @@
-from PySide6.QtCore import Signal, QTimer, QObject, Qt, QDateTime
+from PySide6.QtCore import Signal, QTimer, QObject, Qt, QEvent, QAbstractTableModel, QModelIndex, QThreadPool, \
+    QSettings
 from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QDialog, QTableWidget, \
-    QTableWidgetItem, QLabel, QTextEdit, QHeaderView, QLineEdit, QMessageBox, QSpinBox
-from PySide6.QtGui import QFont
-import pytz
-import pandas as pd
-import sqlite3
-import keyring
-from iracingdataapi.client import irDataClient
+    QTableWidgetItem, QLabel, QHeaderView, QLineEdit, QMessageBox, QSpinBox, QTableView, QHBoxLayout, \
+    QCheckBox, QFileDialog
+from PySide6.QtGui import QFont, QKeySequence, QShortcut
+import logging
+import math
+import os
+import threading
+import weakref
+from collections import OrderedDict
+import time
 from datetime import datetime
+from simracing_core import (Catalog, DataStorage, Instrumentation, IRacingDataFetcher, IRacingHistorySync,
+                            IRacingRaceResult, IRacingSession, RaceGuideIndex, RaceResult, ResponseCache, TimeConverter,
+                            WorldRanking, max_field_strength, validate_result)
+from simracing_core.lazy import LazyModule
+
+keyring = LazyModule("keyring")
+logger = logging.getLogger(__name__)
+instrumentation = Instrumentation.shared()
+
 class SignalHandler(QObject):
     showStatsSignal = Signal()
 
-class RaceResult:
-    def __init__(self, *args, **kwargs):
-        self.car_model = kwargs.get("car_model", "")
-        self.incidents_count = kwargs.get("incidents_count", 0)
-        self.position_in_race = kwargs.get("position_in_race", 0)
-        self.track_name = kwargs.get("track_name", "")
-
-class DataStorage:
-    def __init__(self):
-        self.car_model = None
-        self.incidents_count = None
-        self.position_in_race = None
-        self.track_name = None
-        self.results_history = []
-        self.max_results_history = 15
-        self.conn = sqlite3.connect("data.db")
-        self.create_table()
-
-    def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS results (
-                car_model TEXT,
-                incidents_count INTEGER,
-                position_in_race INTEGER,
-                track_name TEXT
-            )
-        ''')
-        self.conn.commit()
-
-    def load_from_database(self):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM results')
-        rows = cursor.fetchall()
-        self.results_history = [
-            RaceResult(car_model=row[0], incidents_count=row[1], position_in_race=row[2], track_name=row[3]) for row in rows
-        ]
-
-    def save_to_database(self):
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM results')
-        for result in self.results_history:
-            cursor.execute('''
-                INSERT INTO results (car_model, incidents_count, position_in_race, track_name)
-                VALUES (?, ?, ?, ?)
-            ''', (result.car_model, result.incidents_count, result.position_in_race, result.track_name))
-        self.conn.commit()
-
-    def add_result_to_history(self, result):
-        self.results_history.insert(0, result)
-        self.results_history = self.results_history[:self.max_results_history]
-        self.save_to_database()
+class ResultsTableModel(QAbstractTableModel):
+    columns = [
+        ("car_model", "Model auta"),
+        ("incidents_count", "Ilość incydentów"),
+        ("position_in_race", "Pozycja w wyścigu"),
+        ("track_name", "Tor"),
+    ]
+    # Pozycje kolumn w wierszu zwracanym przez DataStorage.fetch_results_page
+    row_fields = {"id": 0, "car_model": 3, "incidents_count": 4, "position_in_race": 5, "track_name": 6}
+
+    def __init__(self, data_storage, game=None, page_size=200, parent=None):
+        super().__init__(parent)
+        self.data_storage = data_storage
+        self.game = game
+        self.page_size = page_size
+        self.search = ""
+        self.order_column = "id"
+        self.descending = True
+        self.rows = []
+        self.total_rows = 0
+        self.loaded_generation = None
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = []
+        self.total_rows = self.data_storage.count_results(self.game, self.search)
+        self.loaded_generation = self.data_storage.generation
+        self.endResetModel()
+
+    def refresh_if_changed(self):
+        if self.loaded_generation != self.data_storage.generation:
+            self.refresh()
+
+    def set_search(self, search):
+        self.search = search.strip()
+        self.refresh()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.rows) < self.total_rows
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        after = None
+        if self.rows:
+            last_row = self.rows[-1]
+            after = (last_row[self.row_fields[self.order_column]], last_row[0])
+        with instrumentation.span("ui.results_page") as span:
+            page = self.data_storage.fetch_results_page(after, self.page_size, self.order_column, self.descending,
+                                                        self.game, self.search)
+            span.rows = len(page)
+        if not page:
+            self.total_rows = len(self.rows)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.rows[index.row()][self.row_fields[self.columns[index.column()][0]]]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][1]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.order_column = self.columns[column][0] if column >= 0 else "id"
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+def create_results_view(data_storage, game, parent=None):
+    results_view = QTableView(parent)
+    # Z grą w zapytaniu każde sortowanie czyta gotową kolejność z indeksu (gra, kolumna)
+    results_view.setModel(ResultsTableModel(data_storage, game, parent=results_view))
+    # Bez wskaźnika sortowania widok zostaje przy kolejności od najnowszych wyników
+    results_view.horizontalHeader().setSortIndicator(-1, Qt.DescendingOrder)
+    results_view.setSortingEnabled(True)
+    results_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    # Stała wysokość wierszy - widok nie musi mierzyć każdego wiersza przy przewijaniu
+    results_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    return results_view
+
+class RecordTableModel(QAbstractTableModel):
+    def __init__(self, columns, parent=None):
+        super().__init__(parent)
+        # Kolumny to pary (nagłówek, funkcja formatująca rekord) - tekst powstaje dopiero dla widocznych komórek
+        self.columns = columns
+        self.records = []
+
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = records
+        self.endResetModel()
+
+    def refresh_text(self):
+        # Rekordy się nie zmieniły, ale formatery mogą teraz zwrócić inny tekst (np. po odświeżeniu katalogów)
+        if self.records:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.records) - 1, len(self.columns) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return str(self.columns[index.column()][1](self.records[index.row()]))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return str(section + 1)
+
+def format_average(value):
+    # Wiersze przeniesione ze starej bazy mogą nie mieć incydentów ani pozycji - wtedy średniej nie ma
+    return "" if value is None else f"{value:.2f}"
+
+def create_record_view(columns, parent=None):
+    record_view = QTableView(parent)
+    record_view.setModel(RecordTableModel(columns, record_view))
+    record_view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+    record_view.horizontalHeader().setStretchLastSection(True)
+    record_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    return record_view
 
 class MainWindow(QWidget):
     showStatsSignal = Signal()
@@ -82,12 +184,24 @@ class MainWindow(QWidget):
         button_iracing.clicked.connect(lambda: self.show_game_options("iRacing"))
         layout.addWidget(button_iracing)
 
-        self.data_storage = DataStorage()
-        self.data_storage.load_from_database()
         self.setLayout(layout)
         font = QFont("Calibri", 15)
         self.setFont(font)
 
+        # Pomiary są ukryte przed zwykłym użytkownikiem - okno otwiera skrót, także nad innymi oknami aplikacji
+        metrics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        metrics_shortcut.setContext(Qt.ApplicationShortcut)
+        metrics_shortcut.activated.connect(self.show_metrics)
+
+    def show_metrics(self):
+        metrics_window = MetricsWindow(instrumentation, self)
+        metrics_window.exec()
+
+    @property
+    def data_storage(self):
+        # Bazę otwieramy przy pierwszym wejściu w grę, a nie przed pokazaniem okna wyboru
+        return DataStorage.shared()
+
     def show_game_options(self, game_name):
         if game_name == "Project Cars 2":
             project_cars_options_window = ProjectCarsOptionsWindow(self.data_storage, self)
@@ -105,36 +219,39 @@ class MainWindow(QWidget):
         self.showStatsSignal.emit()
 
 class StatsWindow(QDialog):
-    def __init__(self, results_history, parent=None):
+    def __init__(self, data_storage, parent=None):
         super().__init__(parent)
 
         self.setWindowTitle("Twoje statystyki")
 
         layout = QVBoxLayout()
-        self.setFixedSize(555, 500)
+        self.setFixedSize(555, 700)
 
-        self.results_table = QTableWidget(self)
-        self.results_table.setColumnCount(4)
-        self.results_table.setHorizontalHeaderLabels(["Model auta", "Ilość incydentów", "Pozycja w wyścigu", "Tor"])
+        self.data_storage = data_storage
+
+        self.search_lineedit = QLineEdit(self)
+        self.search_lineedit.setPlaceholderText("Szukaj auta lub toru")
+        layout.addWidget(self.search_lineedit)
 
+        self.results_table = create_results_view(self.data_storage, "Project Cars 2", self)
+        self.search_lineedit.textChanged.connect(self.results_table.model().set_search)
         layout.addWidget(self.results_table)
-        self.data_storage = DataStorage()
-        self.data_storage.load_from_database()
-        self.populate_results_table(results_history)
 
-        self.setLayout(layout)
+        self.car_stats_table = create_record_view([
+            ("Model auta", lambda stats: stats["car_model"] or ""),
+            ("Ilość wyścigów", lambda stats: stats["races_count"]),
+            ("Średnia incydentów", lambda stats: format_average(stats["avg_incidents"])),
+            ("Średnia pozycja", lambda stats: format_average(stats["avg_position"])),
+        ], self)
+        layout.addWidget(self.car_stats_table)
+        self.populate_car_stats_table(self.data_storage.stats_by_car())
 
-    def populate_results_table(self, results_history):
-        for row, result in enumerate(results_history):
-            self.results_table.insertRow(row)
-            self.results_table.setItem(row, 0, QTableWidgetItem(result.car_model))
-            self.results_table.setItem(row, 1, QTableWidgetItem(str(result.incidents_count)))
-            self.results_table.setItem(row, 2, QTableWidgetItem(str(result.position_in_race) if result.position_in_race is not None else ""))
-            self.results_table.setItem(row, 3, QTableWidgetItem(result.track_name if result.track_name is not None else ""))
+        self.setLayout(layout)
 
-        self.results_table.resizeColumnsToContents()
-        header = self.results_table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+    def populate_car_stats_table(self, car_stats):
+        # Cała lista trafia do modelu jednym resetem, niezależnie od liczby aut
+        self.car_stats_table.model().set_records(car_stats)
+        self.car_stats_table.resizeColumnsToContents()
 
 class ProjectCarsOptionsWindow(QDialog):
     showStatsSignal = Signal()
@@ -147,6 +264,9 @@ class ProjectCarsOptionsWindow(QDialog):
 
         layout = QVBoxLayout()
 
+        self.rating_label = QLabel(self)
+        layout.addWidget(self.rating_label)
+
         button_stats = QPushButton("Twoje statystyki")
         button_stats.clicked.connect(self.show_stats)
         layout.addWidget(button_stats)
@@ -161,11 +281,21 @@ class ProjectCarsOptionsWindow(QDialog):
 
         self.results_table = None
         self.data_storage = data_storage  
+        self.update_rating_label()
 
         self.setLayout(layout)
 
+    def update_rating_label(self):
+        with instrumentation.span("ui.project_cars.rating"):
+            rating = self.data_storage.game_rating("Project Cars 2")
+        self.rating_label.setText(f"Poziom umiejętności: {rating.skill:.0f}\n"
+                                  f"Ocena bezpieczeństwa: {rating.safety:.2f} / 10")
+
     def show_stats(self):
-        stats_window = StatsWindow(self.data_storage.results_history, self)
+        self.update_rating_label()
+        # Mierzymy przygotowanie okna - exec() czeka już na użytkownika
+        with instrumentation.span("ui.project_cars.stats_window"):
+            stats_window = StatsWindow(self.data_storage, self)
         stats_window.exec()
 
     def show_add_results_options(self):
@@ -174,24 +304,15 @@ class ProjectCarsOptionsWindow(QDialog):
         add_results_options_window.exec()
 
     def initialize_results_table(self):
-        self.results_table = QTableWidget(self)
-        self.results_table.setColumnCount(4)
-        self.results_table.setHorizontalHeaderLabels(["Model auta", "Ilość incydentów", "Pozycja w wyścigu", "Tor"])
-        self.results_table.resizeColumnsToContents()
+        self.results_table = create_results_view(self.data_storage, "Project Cars 2", self)
+        self.layout().addWidget(self.results_table)
 
     def populate_results_table(self):
-        latest_results = self.data_storage.results_history
-        self.initialize_results_table()
-
-        for row, result in enumerate(latest_results):
-            self.results_table.insertRow(row)
-            self.results_table.setItem(row, 0, QTableWidgetItem(result.car_model))
-            self.results_table.setItem(row, 1, QTableWidgetItem(str(result.incidents_count)))
-            self.results_table.setItem(row, 2, QTableWidgetItem(str(result.position_in_race) if result.position_in_race is not None else ""))
-            self.results_table.setItem(row, 3, QTableWidgetItem(result.track_name if result.track_name is not None else ""))
-
-        layout = self.layout()
-        layout.addWidget(self.results_table)
+        with instrumentation.span("ui.project_cars.results_table"):
+            if self.results_table is None:
+                self.initialize_results_table()
+            else:
+                self.results_table.model().refresh_if_changed()
         self.setFixedSize(593, 675)
 
 class AddResultsOptionsWindow(QDialog):
@@ -216,6 +337,12 @@ class AddResultsOptionsWindow(QDialog):
         self.position_in_race_spinbox.setPrefix("Pozycja w wyścigu: ")
         self.position_in_race_spinbox.setMinimum(1)
         layout.addWidget(self.position_in_race_spinbox)
+        self.field_strength_spinbox = QSpinBox(self)
+        self.field_strength_spinbox.setPrefix("Średni poziom wyścigu: ")
+        self.field_strength_spinbox.setRange(0, max_field_strength)
+        self.field_strength_spinbox.setSingleStep(100)
+        self.field_strength_spinbox.setSpecialValueText("Średni poziom wyścigu: nieznany")
+        layout.addWidget(self.field_strength_spinbox)
         self.car_model_lineedit = QLineEdit(self)
         self.car_model_lineedit.setPlaceholderText("Wprowadź nazwę auta")
         layout.addWidget(self.car_model_lineedit)
@@ -227,7 +354,7 @@ class AddResultsOptionsWindow(QDialog):
         layout.addWidget(back_button)
 
         self.data_storage = data_storage
-        self.data_storage.load_from_database()
+        self.data_storage.refresh_history()
         self.setLayout(layout)
 
     def save_and_close(self):
@@ -235,211 +362,377 @@ class AddResultsOptionsWindow(QDialog):
         car_model = self.car_model_lineedit.text()
         incidents_count = self.incidents_count_spinbox.value()
         position_in_race = self.position_in_race_spinbox.value()
+        field_strength = self.field_strength_spinbox.value()
 
-        if track_name and car_model:
+        error = validate_result(track_name, car_model, position_in_race, incidents_count, field_strength)
+        if error is None:
             result = RaceResult(
                 car_model=car_model,
                 incidents_count=incidents_count,
                 position_in_race=position_in_race,
-                track_name=track_name
+                track_name=track_name,
+                field_strength=field_strength
             )
-            self.data_storage.add_result_to_history(result)
-            self.data_storage.save_to_database()
+            with instrumentation.span("ui.project_cars.save_result", rows=1):
+                self.data_storage.add_result_to_history(result)
             self.showStatsSignal.emit()
             self.accept()
         else:
-            QMessageBox.warning(
-                self, "Brak wymaganych informacji", "Wprowadź wszystkie wymagane informacje."
-            )
-class IRacingRaceResult:
-
-    car_id_to_car_name = {
-        1:"Skip Barber Formula 2000",
-        2:"Modified - SK",
-        3:"Pontiac Solstice",
-        4:"[Legacy] Pro Mazda",
-        5:"Legends Ford '34 Coupe",
-        10:"Pontiac Solstice - Rookie",
-        11:"Legends Ford '34 Coupe - Rookie",
-        12:"[Retired] - Chevrolet Monte Carlo SS",
-        13:"Radical SR8",
-        18:"Silver Crown",
-        20:"[Legacy] NASCAR Truck Chevrolet Silverado - 2008",
-        21:"[Legacy] Riley MkXX Daytona Prototype - 2008",
-        22:"[Legacy] NASCAR Cup Chevrolet Impala COT - 2009",
-        23:"SCCA Spec Racer Ford",
-        24:"ARCA Menards Chevrolet Impala",
-        25:"Lotus 79",
-        26:"Chevrolet Corvette C6.R GT1",
-        27:"VW Jetta TDI Cup",
-        28:"[Legacy] V8 Supercar Ford Falcon - 2009",
-        29:"[Legacy] Dallara IR-05",
-        30:"Ford Mustang FR500S",
-        31:"Modified - NASCAR Whelen Tour",
-        33:"Williams-Toyota FW31",
-        34:"[Legacy] Mazda MX-5 Cup - 2010",
-        35:"[Legacy] Mazda MX-5 Roadster - 2010",
-        36:"Street Stock",
-        37:"Sprint Car",
-        38:"[Legacy] NASCAR Nationwide Chevrolet Impala - 2012",
-        39:"HPD ARX-01c",
-        41:"Cadillac CTS-V Racecar",
-        43:"McLaren MP4-12C GT3",
-        44:"Kia Optima",
-        59:"Ford GT GT3",
-        67:"Global Mazda MX-5 Cup",
-        128:"Dallara P217",
-        132:"BMW M4 GT3",
-        148:"FIA F4",
-        157:"Mercedes-AMG GT4",
-        159:"BMW M Hybrid V8",
-        160:"Toyota GR86",
-        169:"Porsche 911 GT3 R (992)",
-        173:"Ferrari 296 GT3",
-        176:"Audi R8 LMS EVO II GT3",
-    }
-    def __init__(self, race_data):
-        self.series_name = race_data.get('series_name', '')
-        self.start_position = race_data.get('start_position', 0)
-        self.finish_position = race_data.get('finish_position', 0)
-        self.track_name = race_data.get('track', {}).get('track_name', '')
-        self.incidents_count = race_data.get('incidents', 0)
-        self.points = race_data.get('points', 0)
-        self.strength_of_field = race_data.get('strength_of_field', 0)
-        self.oldi_rating = race_data.get('oldi_rating', '')
-        self.newi_rating = race_data.get('newi_rating', '')
-        self.laps_led = race_data.get('laps_led', 0)
-        self.car_id = race_data.get('car_id', 0)
-        self.car_name = IRacingRaceResult.car_id_to_car_name.get(self.car_id, 'Unknown')
-    
+            QMessageBox.warning(self, "Brak wymaganych informacji", error)
+class WorldRankingModel(QAbstractTableModel):
+    columns = [
+        ("rank", "Miejsce", "IRATING"),
+        ("driver", "Kierowca", "DRIVER"),
+        ("irating", "iRating", "IRATING"),
+        ("avg_inc", "Średnia incydentów", "AVG_INC"),
+        ("avg_finish_pos", "Średnia pozycja", "AVG_FINISH_POS"),
+    ]
+
+    def __init__(self, world_ranking, page_size=100, max_cached_pages=8, parent=None):
+        super().__init__(parent)
+        self.world_ranking = world_ranking
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self.query = {}
+        self.selection = range(0)
+        # W pamięci trzymamy tylko kilka ostatnio oglądanych stron wierszy
+        self.pages = OrderedDict()
+
+    def set_query(self, **query):
+        self.query.update(query)
+        if self.world_ranking.loaded_signature is None:
+            # Ranking wczytuje się w tle - zapytanie wykona się dopiero po wczytaniu
+            return
+        with instrumentation.span("ui.world_ranking.select") as span:
+            self.beginResetModel()
+            self.selection = self.world_ranking.select(**self.query)
+            self.pages.clear()
+            self.endResetModel()
+            span.rows = len(self.selection)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.selection)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def page(self, page_index):
+        hit = page_index in self.pages
+        instrumentation.record_cache("world_ranking_pages", hit)
+        if hit:
+            self.pages.move_to_end(page_index)
+            return self.pages[page_index]
+        begin = page_index * self.page_size
+        rows = self.world_ranking.rows(self.selection[begin:begin + self.page_size])
+        self.pages[page_index] = rows
+        if len(self.pages) > self.max_cached_pages:
+            self.pages.popitem(last=False)
+        return rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row = self.page(index.row() // self.page_size)[index.row() % self.page_size]
+        value = row[self.columns[index.column()][0]]
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][1]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0:
+            self.set_query(sort_by="IRATING", descending=True)
+            return
+        sort_by = self.columns[column][2]
+        descending = order == Qt.DescendingOrder
+        if column == 0:
+            # Najlepsze miejsce w rankingu to najwyższy iRating
+            descending = not descending
+        self.set_query(sort_by=sort_by, descending=descending)
+
+class WorldRankingBrowser(QWidget):
+    def __init__(self, world_ranking, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        filters_layout = QHBoxLayout()
+        self.search_lineedit = QLineEdit(self)
+        self.search_lineedit.setPlaceholderText("Szukaj kierowcy")
+        filters_layout.addWidget(self.search_lineedit)
+        self.substring_checkbox = QCheckBox("Zawiera", self)
+        filters_layout.addWidget(self.substring_checkbox)
+        self.min_irating_spinbox = QSpinBox(self)
+        self.min_irating_spinbox.setPrefix("iRating od: ")
+        self.min_irating_spinbox.setRange(0, 20000)
+        filters_layout.addWidget(self.min_irating_spinbox)
+        self.max_irating_spinbox = QSpinBox(self)
+        self.max_irating_spinbox.setPrefix("do: ")
+        self.max_irating_spinbox.setRange(0, 20000)
+        self.max_irating_spinbox.setValue(20000)
+        filters_layout.addWidget(self.max_irating_spinbox)
+        layout.addLayout(filters_layout)
+
+        self.model = WorldRankingModel(world_ranking, parent=self)
+        self.table_view = QTableView(self)
+        self.table_view.setModel(self.model)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.DescendingOrder)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        layout.addWidget(self.table_view)
+
+        self.search_lineedit.textChanged.connect(self.apply_filters)
+        self.substring_checkbox.toggled.connect(self.apply_filters)
+        self.min_irating_spinbox.valueChanged.connect(self.apply_filters)
+        self.max_irating_spinbox.valueChanged.connect(self.apply_filters)
+
+    def apply_filters(self):
+        self.model.set_query(
+            search=self.search_lineedit.text().strip(),
+            substring=self.substring_checkbox.isChecked(),
+            min_irating=self.min_irating_spinbox.value(),
+            max_irating=self.max_irating_spinbox.value(),
+        )
+        self.table_view.scrollToTop()
+
+class TaskSignals(QObject):
+    finished = Signal(object, object)
+    failed = Signal(object, object)
+
+class ApiTask:
+    def __init__(self, name, fetch):
+        self.name = name
+        self.fetch = fetch
+        self.signals = TaskSignals()
+        self.cancelled = threading.Event()
+        self.done = False
+        # Czas od kliknięcia do wyniku w wątku GUI, razem z czekaniem w kolejce puli wątków
+        self.submitted_at = time.perf_counter()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        try:
+            # Zapytanie dostaje zdarzenie anulowania - długie pobieranie (np. synchronizacja historii)
+            # sprawdza je między kolejnymi zapytaniami i kończy się, zamiast zajmować wątek puli
+            result = self.fetch(self.cancelled)
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.signals.failed.emit(self, e)
+            return
+        if not self.cancelled.is_set():
+            self.signals.finished.emit(self, result)
+
+class ApiTaskExecutor(QObject):
+    # Pula jest wspólna i nie należy do okna - destruktor puli czeka na trwające zapytania,
+    # więc zamknięcie okna blokowałoby wątek GUI do ich końca
+    thread_pool = None
+    executors = weakref.WeakSet()
+
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        if ApiTaskExecutor.thread_pool is None:
+            ApiTaskExecutor.thread_pool = QThreadPool()
+            ApiTaskExecutor.thread_pool.setMaxThreadCount(max_threads)
+        ApiTaskExecutor.executors.add(self)
+        self.tasks = {}
+
+    @classmethod
+    def shutdown(cls):
+        # Przy wyjściu odrzucamy zadania z kolejki, a trwające prosimy o zakończenie po bieżącym zapytaniu
+        for executor in list(cls.executors):
+            executor.cancel_all()
+        if cls.thread_pool is not None:
+            cls.thread_pool.clear()
+
+    def submit(self, name, fetch, on_finished, on_failed, timeout=30):
+        # Nowe zapytanie o to samo zastępuje poprzednie - wynik starego zostanie pominięty
+        self.cancel(name)
+        task = ApiTask(name, fetch)
+        self.tasks[name] = (task, on_finished, on_failed)
+        task.signals.finished.connect(self.handle_finished)
+        task.signals.failed.connect(self.handle_failed)
+        QTimer.singleShot(int(timeout * 1000), self, lambda: self.handle_timeout(task))
+        self.thread_pool.start(task.run)
+        return task
+
+    def handle_finished(self, task, result):
+        callbacks = self.take(task)
+        if callbacks:
+            self.record(task)
+            callbacks[0](result)
+
+    def handle_failed(self, task, error):
+        callbacks = self.take(task)
+        if callbacks:
+            self.record(task, error=True)
+            callbacks[1](error)
+
+    def handle_timeout(self, task):
+        callbacks = self.take(task)
+        if callbacks:
+            task.cancel()
+            self.record(task, error=True)
+            callbacks[1](TimeoutError("Przekroczono limit czasu zapytania"))
+
+    def record(self, task, error=False):
+        instrumentation.record(f"task.{task.name}", time.perf_counter() - task.submitted_at, error=error)
+
+    def take(self, task):
+        # Wywoływane tylko w wątku GUI, więc wynik, błąd i limit czasu nie mogą się zdublować
+        entry = self.tasks.get(task.name)
+        if entry is None or entry[0] is not task or task.done or task.cancelled.is_set():
+            return None
+        task.done = True
+        del self.tasks[task.name]
+        return entry[1:]
+
+    def cancel(self, name):
+        entry = self.tasks.pop(name, None)
+        if entry is not None:
+            entry[0].cancel()
+
+    def cancel_all(self):
+        for name in list(self.tasks):
+            self.cancel(name)
+
+class ClockScheduler(QObject):
+    # Jeden zegar dla całej aplikacji: budzi się tylko wtedy, gdy widoczny widżet czeka na odświeżenie
+    # (tyknięcie zegara albo termin, np. start wyścigu czy wygaśnięcie cache), a poza tym śpi
+    shared_instance = None
+    # Tyknięcia wypadają tuż po pełnej sekundzie, żeby zegar na ekranie nie spóźniał się o prawie sekundę
+    tick_margin = 0.005
+    # Termin tuż przed tyknięciem wykonujemy razem z nim - jedno wybudzenie zamiast dwóch
+    coalesce_window = 0.25
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.run_due)
+        # (widżet, funkcja) -> [odstęp w sekundach, następne wywołanie]
+        self.ticks = {}
+        # klucz -> (widżet, termin w sekundach od epoki, funkcja)
+        self.deadlines = {}
+        self.watched_widgets = set()
+
+    @classmethod
+    def shared(cls):
+        if cls.shared_instance is None:
+            cls.shared_instance = cls()
+        return cls.shared_instance
+
+    def subscribe(self, widget, callback, interval=1.0):
+        # Pierwsze wywołanie od razu, kolejne co interval, tylko gdy widżet jest widoczny
+        self.ticks[(widget, callback)] = [interval, 0.0]
+        self.watch(widget)
+        self.reschedule()
+
+    def unsubscribe(self, widget, callback):
+        if self.ticks.pop((widget, callback), None) is not None:
+            self.reschedule()
+
+    def schedule_at(self, key, widget, due_at, callback):
+        # Nowy termin o tym samym kluczu zastępuje poprzedni; termin ukrytego widżetu czeka na jego pokazanie
+        self.deadlines[key] = (widget, due_at, callback)
+        self.watch(widget)
+        self.reschedule()
+
+    def cancel(self, widget):
+        # Usuwa subskrypcje i terminy widżetu i wszystkich jego dzieci, np. gdy okno jest zamykane
+        def owned(item_widget):
+            return item_widget is widget or widget.isAncestorOf(item_widget)
+        self.ticks = {key: tick for key, tick in self.ticks.items() if not owned(key[0])}
+        self.deadlines = {key: deadline for key, deadline in self.deadlines.items() if not owned(deadline[0])}
+        self.reschedule()
+
+    def watch(self, widget):
+        # Okno główne widżetu też obserwujemy - zminimalizowanie nie chowa widżetu, zmienia stan okna
+        for widget in {widget, widget.window()}:
+            self.watch_widget(widget)
+
+    def watch_widget(self, widget):
+        if widget not in self.watched_widgets:
+            self.watched_widgets.add(widget)
+            widget.installEventFilter(self)
+            widget.destroyed.connect(lambda _=None, widget=widget: self.forget(widget))
+
+    def forget(self, widget):
+        self.watched_widgets.discard(widget)
+        self.ticks = {key: tick for key, tick in self.ticks.items() if key[0] is not widget}
+        self.deadlines = {key: deadline for key, deadline in self.deadlines.items() if deadline[0] is not widget}
+        self.reschedule()
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Show:
+            # Pokazany widżet od razu dostaje aktualny stan, a nie dopiero przy następnym tyknięciu
+            for (widget, _), tick in self.ticks.items():
+                if widget is watched:
+                    tick[1] = 0.0
+            self.reschedule()
+        elif event.type() == QEvent.Hide:
+            self.reschedule()
+        elif event.type() == QEvent.WindowStateChange:
+            # Po przywróceniu okna jego widżety od razu dostają aktualny stan
+            if not watched.isMinimized():
+                for (widget, _), tick in self.ticks.items():
+                    if widget.window() is watched:
+                        tick[1] = 0.0
+            self.reschedule()
+        return False
+
+    def is_active(self, widget):
+        # Widoczne okno odświeżamy także bez fokusu (np. obok gry); zminimalizowane śpi do przywrócenia
+        return widget.isVisible() and not widget.window().isMinimized()
+
+    def next_wakeup(self):
+        next_tick = min((tick[1] for (widget, _), tick in self.ticks.items() if self.is_active(widget)),
+                        default=None)
+        next_deadline = min((due_at for widget, due_at, _ in self.deadlines.values() if self.is_active(widget)),
+                            default=None)
+        if next_deadline is None:
+            return next_tick
+        if next_tick is None:
+            return next_deadline
+        return next_tick if next_deadline >= next_tick - self.coalesce_window else next_deadline
+
+    def reschedule(self):
+        wakeup = self.next_wakeup()
+        if wakeup is None:
+            self.timer.stop()
+        else:
+            self.timer.start(max(0, math.ceil((wakeup - time.time()) * 1000)))
+
+    def run_due(self):
+        now = time.time()
+        for key, tick in list(self.ticks.items()):
+            widget, callback = key
+            if tick[1] <= now and key in self.ticks and self.is_active(widget):
+                interval = tick[0]
+                tick[1] = (math.floor(now / interval) + 1) * interval + self.tick_margin
+                callback()
+        for key, (widget, due_at, callback) in list(self.deadlines.items()):
+            if due_at <= now and self.deadlines.get(key, (None, None))[1] == due_at and self.is_active(widget):
+                del self.deadlines[key]
+                callback()
+        self.reschedule()
 
 class IRacingOptionsWindow(QDialog):
     showStatsSignal = Signal()
     showWorldRankingSignal = Signal()
     showUpcomingRacesSignal = Signal()
 
-    series_id_to_name = {
-        32: "Advanced Legends Cup",
-        33: "iRacing Late Model Tour",
-        34: "Skip Barber Race Series",
-        45: "SK Modified Weekly Series",
-        47: "NASCAR iRacing Class C",
-        53: "Silver Crown Cup",
-        58: "NASCAR Class A",
-        62: "NASCAR iRacing Class B",
-        63: "Spec Racer Ford Challenge",
-        65: "Classic Lotus Grand Prix",
-        74: "Radical Esports Cup",
-        102: "NASCAR Tour Modified Series",
-        103: "NASCAR Class B Fixed Setup",
-        112: "Production Car Sim-Lab Challenge",
-        116: "Carburetor Cup",
-        131: "Sprint Car Cup",
-        133: "US Open Wheel B - Dallara IR-18",
-        139: "Global Mazda MX-5 Fanatec Cup",
-        164: "NASCAR Class C Maconi Setup Shop Fixed",
-        165: "US Open Wheel C - Dallara IR18 Fixed Series",
-        167: "ARCA Menards Series",
-        182: "Street Stock Fanatec Series - R",
-        190: "Street Stock Next Level Racing Series - C",
-        191: "NASCAR Class A Fixed",
-        201: "Grand Prix Legends",
-        210: "Global Fanatec Challenge",
-        223: "Super Late Model Series",
-        228: "GT Sprint VRS Series",
-        231: "Advanced Mazda MX-5 Cup Series",
-        237: "GT Endurance VRS Series",
-        259: "PickUp Cup",
-        260: "Formula A - Grand Prix Series",
-        285: "IMSA Vintage Series",
-        291: "DIRTcar Limited Late Model Series",
-        292: "DIRTcar 305 Sprint Car Fanatec Series",
-        299: "iRacing Porsche Cup",
-        305: "DIRTcar 360 Sprint Car Carquest Series",
-        306: "DIRTcar Pro Late Model Series",
-        307: "World of Outlaws Sprint Car Series",
-        308: "World of Outlaws Late Model Series",
-        309: "AMSOIL USAC Sprint Car - Fixed",
-        310: "USAC 360 Sprint Car Series",
-        311: "DIRTcar Class C Street Stock Series - Fixed",
-        315: "Dirt Legends Cup",
-        325: "Rallycross Series",
-        327: "Dirt Midget Cup",
-        353: "Ferrari GT3 Challenge - Fixed",
-        359: "Formula B - Formula Renault 3.5 Series",
-        369: "World of Outlaws Late Model Series - Fixed",
-        391: "Pro 4 Off Road Racing Series",
-        399: "Supercars Series",
-        405: "Supercars Series - Australian Server Only",
-        413: "NASCAR Legends Series",
-        414: "US Open Wheel C - Indy Pro 2000 Series",
-        416: "Super Late Model Series - Fixed",
-        417: "NASCAR Tour Modified Series - Fixed",
-        419: "IMSA Endurance Series",
-        428: "SUPER DIRTcar Big Block Modified Series",
-        429: "Dallara Formula iR - Fixed",
-        430: "Touring Car Challenge - Fixed",
-        431: "Formula C - DOF Reality Dallara F3 Series",
-        432: "Proto-GT Thrustmaster Challenge",
-        440: "CARS Late Model Stock Toyr - Fixed",
-        441: "SK Modified Weekly Series - Fixed",
-        442: "DIRTcar UMP Modified Series - Fixed",
-        443: "US Open Wheel D - USF 2000 Series - Fixed",
-        444: "GT3 Fanatec Challenge - Fixed",
-        446: "Rookie DIRTcar Street Stock Series - Fixed",
-        447: "IMSA iRacing Series",
-        455: "Formula Vee SIMAGIC Series",
-        456: "Formula C - Thrustmaster Dallara F3 Series - Fixed",
-        457: "LMP2 Prototype Challenge Fixed",
-        458: "World of Outlaws Sprint Car Series - Fixed",
-        459: "Rookie IRX Volkswagen Beetle Lite - Fixed",
-        460: "iRX Volkswagen Beetle Lite",
-        461: "Rallycross Series - Fixed",
-        462: "Rookie Pro 2 Lite Off-Road Racing Series - Fixed",
-        463: "Pro 4 Off-Road Racing Series - Fixed",
-        464: "Pro 2 Off-Road Racing Series - Fixed",
-        466: "DIRTcar 358 Modified Engine Ice Series",
-        471: "Dallara Dash",
-        476: "iRacing Porsche Cup - Fixed",
-        481: "Winter iRacing Nascar Series - Fixed",
-        482: "Winter iRacing Nascar Series",
-        483: "Rookie Legends VRS Cup",
-        484: "Formula A - Grand Prix Series - Fixed",
-        490: "Pro 2 Off-Road Racing Series",
-        491: "GT4 Falken Tyre Challenge-Fixed",
-        492: "IMSA Michelin Pilot Challenge",
-        493: "Stock Car Brasil - Fixed",
-        497: "FIA Formula 4 Challenge",
-        498: "FIA Formula 4 Challenge - Fixed",
-        500: "Dirt Super Late Model Tour - Fixed",
-        501: "Dirt 410 Sprint Car Tour",
-        502: "Falken Tyre Sports Car Challenge",
-        503: "Touring Car Challenge",
-        505: "Mission R Challenge - Fixed",
-        514: "GR Buttkicker Cup - Fixed",
-        515: "Dirt Car 360 Sprint Fixed",
-        516: "Dirt Midget Cup Fixed",
-        517: "DIRTcar Pro Late Model Series - Fixed",
-        518: "SUPER DIRTcar Big Block Modifieds Series - Fixed",
-        519: "Clio Cup - Fixed",
-        520: "Formula 1600 Rookie Sim-Motion Series - Fixed",
-        521: "Formula 1600 Thrustmaster Trophy",
-        524: "Gen 4 Cup - Fixed",
-        525: "LMP3 Turn Racing Trophy - Fixed",
-        526: "Ring Meister Ricmotech Series - Fixed",
-        530: "Mustang Skip Barber Challenge - Fixed",
-        535: "GTE Sprint Pure Driving School Series",
-        536: "Formula B - Super Formula IMSIM Series",
-        537: "Formula B - Super Formula IMSIM Series - Fixed",
-        538: "Draft Master - Fixed",
-        539: "IMSA iRacing Series - Fixed",
-        540: "FIA F4 Esports Regional Tour - America",
-        541: "FIA F4 Esports Regional Tour - East",
-        542: "FIA F4 Esports Regional Tour - South",
-        543: "FIA F4 Esports Regional Tour - North",
-        548: "Weekly Race Challenge",
-        
-        }
+    series_catalog = Catalog("series", "get_series", "series_id", "series_name", "Nieznane")
+
     def __init__(self, data_storage, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Opcje iRacing")
@@ -462,6 +755,13 @@ class IRacingOptionsWindow(QDialog):
         self.layout.addWidget(self.button_back)
 
         self.data_storage = data_storage
+        self.iracing_session = IRacingSession.shared()
+        self.fetcher = IRacingDataFetcher(self.iracing_session, ResponseCache.shared())
+        self.history_sync = IRacingHistorySync(self.fetcher, self.data_storage)
+        self.cust_id = 819528
+        self.max_displayed_races = 50
+        self.world_ranking = WorldRanking()
+        self.time_converter = TimeConverter(QSettings("SimracingDataApp", "SimracingDataApp").value("timezone"))
         self.username = ""
         self.password = ""
         self.load_credentials()
@@ -469,34 +769,89 @@ class IRacingOptionsWindow(QDialog):
         self.upcoming_races_label = QLabel("", alignment=Qt.AlignCenter)
         self.layout.addWidget(self.upcoming_races_label)
         
-        self.stats_text_edit = QTextEdit(self)
-        self.stats_text_edit.setReadOnly(True)
-        self.layout.addWidget(self.stats_text_edit)
-        self.stats_text_edit.hide()
-
-        self.world_ranking_text_edit = QTextEdit(self)
-        self.world_ranking_text_edit.setReadOnly(True)
-        self.layout.addWidget(self.world_ranking_text_edit)
-        self.world_ranking_text_edit.hide()
+        self.status_label = QLabel("", alignment=Qt.AlignCenter)
+        self.layout.addWidget(self.status_label)
+        self.status_label.hide()
+
+        self.rating_label = QLabel("", alignment=Qt.AlignCenter)
+        self.layout.addWidget(self.rating_label)
+
+        self.stats_view = create_record_view([
+            ("Series", lambda result: result.series_name),
+            ("Car Model", lambda result: result.car_name),
+            ("Track", lambda result: result.track_name),
+            ("Start Position", lambda result: result.start_position),
+            ("Finish Position", lambda result: result.finish_position),
+            ("Incidents", lambda result: result.incidents_count),
+            ("Points", lambda result: result.points),
+            ("Strength of Field", lambda result: result.strength_of_field),
+            ("Old rating", lambda result: result.oldi_rating),
+            ("New rating", lambda result: result.newi_rating),
+            ("Laps Led", lambda result: result.laps_led),
+        ], self)
+        self.layout.addWidget(self.stats_view)
+        self.stats_view.hide()
+        self.rating_label.hide()
+
+        self.world_ranking_browser = WorldRankingBrowser(self.world_ranking, self)
+        self.layout.addWidget(self.world_ranking_browser)
+        self.world_ranking_browser.hide()
 
         self.showWorldRankingSignal.connect(self.show_world_ranking_table)
 
         self.showStatsSignal.connect(self.show_stats)
 
-        self.upcoming_races_text_edit = QTextEdit()
-        self.upcoming_races_text_edit.setReadOnly(True)
-        self.layout.addWidget(self.upcoming_races_text_edit)
-        self.upcoming_races_text_edit.hide()
+        self.upcoming_races_panel = QWidget(self)
+        upcoming_races_layout = QVBoxLayout(self.upcoming_races_panel)
+        upcoming_races_layout.setContentsMargins(0, 0, 0, 0)
+        upcoming_filters_layout = QHBoxLayout()
+        self.series_filter_lineedit = QLineEdit(self)
+        self.series_filter_lineedit.setPlaceholderText("Filtruj serię")
+        upcoming_filters_layout.addWidget(self.series_filter_lineedit)
+        self.starting_within_spinbox = QSpinBox(self)
+        self.starting_within_spinbox.setRange(0, 24 * 60)
+        self.starting_within_spinbox.setPrefix("Start w ciągu: ")
+        self.starting_within_spinbox.setSuffix(" min")
+        self.starting_within_spinbox.setSpecialValueText("Start: dowolny")
+        upcoming_filters_layout.addWidget(self.starting_within_spinbox)
+        self.fits_within_spinbox = QSpinBox(self)
+        self.fits_within_spinbox.setRange(0, 24 * 60)
+        self.fits_within_spinbox.setPrefix("Koniec w ciągu: ")
+        self.fits_within_spinbox.setSuffix(" min")
+        self.fits_within_spinbox.setSpecialValueText("Koniec: dowolny")
+        upcoming_filters_layout.addWidget(self.fits_within_spinbox)
+        upcoming_races_layout.addLayout(upcoming_filters_layout)
+        self.series_filter_lineedit.textChanged.connect(self.apply_race_guide_filters)
+        self.starting_within_spinbox.valueChanged.connect(self.apply_race_guide_filters)
+        self.fits_within_spinbox.valueChanged.connect(self.apply_race_guide_filters)
+        self.race_guide_index = None
+
+        self.upcoming_races_view = create_record_view([
+            ("Race week number", lambda record: record[0]['race_week_num'] + 1),
+            ("Start Time", lambda record: record[1]),
+            ("End Time", lambda record: record[2]),
+            ("Series name", lambda record: self.series_catalog.lookup(record[0]['series_id'])),
+            ("Entry Count", lambda record: record[0]['entry_count']),
+        ], self)
+        upcoming_races_layout.addWidget(self.upcoming_races_view)
+        self.layout.addWidget(self.upcoming_races_panel)
+        self.upcoming_races_panel.hide()
 
         self.showUpcomingRacesSignal.connect(self.show_upcoming_races)
 
         self.current_time_label = QLabel("", alignment=Qt.AlignCenter)
         self.layout.addWidget(self.current_time_label)
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_current_time)
-        self.timer.start(1000)
-        self.last_api_update_time = QDateTime.currentDateTime()
+        self.api_executor = ApiTaskExecutor(parent=self)
+
+        # Zegar i odliczanie odświeżają się tylko wtedy, gdy ich etykiety są widoczne
+        self.scheduler = ClockScheduler.shared()
+        self.scheduler.subscribe(self.upcoming_races_label, self.update_current_time)
+
+    def done(self, result):
+        self.api_executor.cancel_all()
+        self.scheduler.cancel(self)
+        super().done(result)
         
 
     def show_world_ranking(self):
@@ -506,127 +861,198 @@ class IRacingOptionsWindow(QDialog):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.upcoming_races_label.setText(f"Aktualny czas: {current_time}")
 
-        self.stats_text_edit.hide()
-        self.world_ranking_text_edit.hide()
+        self.stats_view.hide()
+        self.rating_label.hide()
+        self.world_ranking_browser.hide()
 
     def show_world_ranking_table(self):
-        self.world_ranking_text_edit.clear()
-
-        try:
-
-            df = pd.read_csv(r'C:\\Users\\kbuga\\OneDrive\\Pulpit\\EiT 3 SEMESTR\\_repos\\projekt-programowanie-Buglix\\Simracing Data App\\Road_driver_stats.csv')
-            top_30_drivers = df.head(30)
-            for index, row in top_30_drivers.iterrows():
-                driver = row['DRIVER']
-                irating = row['IRATING']
-                avg_incidents = row['AVG_INC']
-                avg_finish = row['AVG_FINISH_POS']
-                self.world_ranking_text_edit.append(f"IRating: {irating}")
-                self.world_ranking_text_edit.append(f"Driver Name: {driver}")
-                self.world_ranking_text_edit.append(f"Average incidents: {avg_incidents}")
-                self.world_ranking_text_edit.append(f"Average finish position: {avg_finish}")
-                self.world_ranking_text_edit.append("-" * 30)
-        except Exception as e:
-            print(f"Błąd podczas wczytywania informacji o rankingu światowym z pliku CSV: {e}")
-    
-        self.world_ranking_text_edit.show()
-        self.stats_text_edit.hide()
+        # Pierwsze wczytanie może budować cache z CSV, więc robimy je w tle
+        self.api_executor.submit("world_ranking", lambda cancelled: self.world_ranking.load(),
+                                 self.display_world_ranking, self.display_world_ranking_error)
+
+    def display_world_ranking(self, world_ranking):
+        self.world_ranking_browser.apply_filters()
+        self.reveal_world_ranking()
+
+    def display_world_ranking_error(self, e):
+        logger.error("Błąd podczas wczytywania informacji o rankingu światowym z pliku CSV: %s", e, exc_info=e)
+        self.reveal_world_ranking()
+
+    def reveal_world_ranking(self):
+        self.world_ranking_browser.show()
+        self.stats_view.hide()
+        self.rating_label.hide()
+        self.status_label.hide()
+        self.upcoming_races_panel.hide()
         self.upcoming_races_label.hide()
-        self.world_ranking_text_edit.verticalScrollBar().setValue(0)
         self.adjustSize()
+
     def show_stats(self):
             if not self.username or not self.password:
                 self.prompt_for_credentials()
                 return
-            try:
-                idc = irDataClient(username=self.username, password=self.password)
-                driver_info = idc.stats_member_recent_races(cust_id=819528)
-                race_results = [IRacingRaceResult(race_data) for race_data in driver_info['races']]
-
-                for result in race_results:
-                    self.stats_text_edit.append(f"Series: {result.series_name}")
-                    self.stats_text_edit.append(f"Car Model: {result.car_name}")
-                    self.stats_text_edit.append(f"Track: {result.track_name}")
-                    self.stats_text_edit.append(f"Start Position: {result.start_position}")
-                    self.stats_text_edit.append(f"Finish Position: {result.finish_position}")
-                    self.stats_text_edit.append(f"Incidents: {result.incidents_count}")
-                    self.stats_text_edit.append(f"Points: {result.points}")
-                    self.stats_text_edit.append(f"Strength of Field: {result.strength_of_field}")
-                    self.stats_text_edit.append(f"Old rating: {result.oldi_rating}")
-                    self.stats_text_edit.append(f"New rating: {result.newi_rating}")
-                    self.stats_text_edit.append(f"Laps Led: {result.laps_led}")
-                    self.stats_text_edit.append("-" * 30)
-
-            except Exception as e:
-                print(f"Błąd podczas pobierania informacji o kierowcy: {e}")
-        
-            self.stats_text_edit.show()
-            self.world_ranking_text_edit.hide()
+            # Historia jest w bazie lokalnej - pokazujemy ją od razu, a w tle pobieramy tylko nowsze wyścigi
+            with instrumentation.span("ui.iracing.load_history") as span:
+                race_results = self.data_storage.load_iracing_results(self.cust_id, self.max_displayed_races)
+                span.rows = len(race_results)
+            if race_results:
+                self.display_stats(race_results)
+            else:
+                self.reveal_stats()
+            self.status_label.setText("Synchronizacja historii wyścigów...")
+            self.status_label.show()
+            self.api_executor.submit("stats", lambda cancelled: self.history_sync.sync(self.cust_id, cancelled),
+                                     self.refresh_stats, self.display_stats_error, timeout=600)
+
+    def refresh_stats(self, new_races):
+            self.status_label.hide()
+            self.display_stats(self.data_storage.load_iracing_results(self.cust_id, self.max_displayed_races))
+            self.refresh_catalogs()
+
+    def display_stats(self, race_results):
+            # Cała zawartość jest podmieniana naraz - widok formatuje tylko widoczne wiersze
+            with instrumentation.span("ui.iracing.display_stats", rows=len(race_results)):
+                self.stats_view.model().set_records(race_results)
+                rating = self.data_storage.iracing_rating(self.cust_id)
+            self.rating_label.setText(f"Poziom umiejętności: {rating.skill:.0f}    "
+                                      f"Ocena bezpieczeństwa: {rating.safety:.2f} / 10")
+            self.reveal_stats()
+
+    def display_stats_error(self, e):
+            logger.error("Błąd podczas pobierania informacji o kierowcy: %s", e, exc_info=e)
+            self.status_label.setText("Nie udało się pobrać wyników z iRacing")
+            self.reveal_stats()
+
+    def reveal_stats(self):
+            self.stats_view.show()
+            self.rating_label.show()
+            self.world_ranking_browser.hide()
+            self.upcoming_races_panel.hide()
             self.upcoming_races_label.hide()
-            self.stats_text_edit.verticalScrollBar().setValue(0)
+            self.stats_view.scrollToTop()
             self.adjustSize()
 
     def show_upcoming_races(self):
             if not self.username or not self.password:
                 self.prompt_for_credentials()
                 return
-            try:
-                idc = irDataClient(username=self.username, password=self.password)
-                upcoming_races_info = idc.season_race_guide()
-
-                for race_info in upcoming_races_info['sessions']:
-
-                    series_name1 = self.series_id_to_name.get(race_info['series_id'], "Nieznane")
-
-                    start_time_str = race_info['start_time']
-                    start_time_utc = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%M:%S%z")
-                    start_time_local = start_time_utc.astimezone(pytz.timezone('Europe/Warsaw'))
-                    start_time_str_local = start_time_local.strftime("%Y-%m-%d %H:%M:%S")
-                    end_time_str = race_info['end_time']
-                    end_time_utc = datetime.strptime(end_time_str, "%Y-%m-%dT%H:%M:%S%z")
-                    end_time_local = end_time_utc.astimezone(pytz.timezone('Europe/Warsaw'))
-                    end_time_str_local = end_time_local.strftime("%Y-%m-%d %H:%M:%S")
-
-                    self.upcoming_races_text_edit.append(f"Race week number: {race_info['race_week_num'] + 1}")
-                    self.upcoming_races_text_edit.append(f"Start Time: {start_time_str_local}")
-                    self.upcoming_races_text_edit.append(f"End Time: {end_time_str_local}")
-                    self.upcoming_races_text_edit.append(f"Series name: {series_name1}")
-                    self.upcoming_races_text_edit.append(f"Entry Count: {race_info['entry_count']}")
-                    self.upcoming_races_text_edit.append("-" * 30)
-
-            except Exception as e:
-                print(f"Błąd podczas pobierania informacji o nadchodzących wyścigach: {e}")
-    
-            self.upcoming_races_text_edit.show()
-            self.stats_text_edit.hide()
-            self.world_ranking_text_edit.hide()
-            self.upcoming_races_text_edit.verticalScrollBar().setValue(0)
+            sessions, fresh = self.fetcher.cached_upcoming_sessions()
+            if sessions is not None:
+                self.display_upcoming_races(sessions)
+            if fresh:
+                self.schedule_race_guide_refresh()
+            else:
+                self.fetch_upcoming_races()
+
+    def fetch_upcoming_races(self):
+            self.api_executor.submit("upcoming_races", lambda cancelled: self.fetcher.upcoming_sessions(),
+                                     self.refresh_upcoming_races, self.display_upcoming_races_error)
+
+    def refresh_upcoming_races(self, sessions):
+            self.display_upcoming_races(sessions)
+            self.schedule_race_guide_refresh()
+            self.refresh_catalogs()
+
+    def schedule_race_guide_refresh(self):
+            # Nowy plan wyścigów pobieramy, gdy odpowiedź w cache się przeterminuje - o ile lista jest wtedy na ekranie
+            expires_at = self.fetcher.cache_expires_at("season_race_guide")
+            if expires_at is not None:
+                self.scheduler.schedule_at((self, "race_guide_refresh"), self.upcoming_races_panel, expires_at,
+                                           self.fetch_upcoming_races)
+
+    def refresh_catalogs(self):
+            # Katalogi aut i serii pobieramy tylko gdy są nieaktualne albo trafiło się nieznane id
+            catalogs = [catalog for catalog in (IRacingRaceResult.car_catalog, self.series_catalog)
+                        if catalog.needs_refresh()]
+            if catalogs:
+                self.api_executor.submit("catalogs", lambda cancelled: [catalog.refresh(self.iracing_session)
+                                                                        for catalog in catalogs
+                                                                        if not cancelled.is_set()],
+                                         self.display_refreshed_catalogs, self.display_catalogs_error)
+
+    def display_refreshed_catalogs(self, refreshed):
+            self.stats_view.model().refresh_text()
+            self.apply_race_guide_filters()
+
+    def display_catalogs_error(self, e):
+            logger.error("Błąd podczas pobierania katalogów aut i serii: %s", e, exc_info=e)
+
+    def display_upcoming_races(self, sessions):
+            with instrumentation.span("ui.iracing.race_guide_index", rows=len(sessions)):
+                self.race_guide_index = RaceGuideIndex(sessions, self.time_converter)
+            # Odliczanie ma sens dopiero, gdy znamy plan wyścigów
+            self.scheduler.subscribe(self.current_time_label, self.update_next_race_countdown)
+            self.apply_race_guide_filters()
+            self.reveal_upcoming_races()
+
+    def race_guide_series_filter(self):
+            text = self.series_filter_lineedit.text().strip()
+            if not text:
+                return None
+            return self.race_guide_index.series_ids_matching(text, self.series_catalog)
+
+    def apply_race_guide_filters(self):
+            if self.race_guide_index is None:
+                return
+            now = time.time()
+            series_ids = self.race_guide_series_filter()
+            if self.fits_within_spinbox.value():
+                positions = self.race_guide_index.fitting_between(now, now + self.fits_within_spinbox.value() * 60,
+                                                                  series_ids)
+            elif self.starting_within_spinbox.value():
+                positions = self.race_guide_index.starting_within(now, self.starting_within_spinbox.value(), series_ids)
+            elif series_ids is not None:
+                positions = self.race_guide_index.for_series(series_ids)
+            else:
+                positions = self.race_guide_index.all_positions()
+            with instrumentation.span("ui.iracing.race_guide_filter", rows=len(positions)):
+                self.upcoming_races_view.model().set_records(self.race_guide_index.records(positions))
+            window_minutes = self.fits_within_spinbox.value() or self.starting_within_spinbox.value()
+            if window_minutes:
+                # Lista z filtrem czasu zmienia się, gdy wyścig wystartuje albo wejdzie w okno - wtedy ją przeliczamy
+                change_at = self.race_guide_index.next_window_change(now, window_minutes * 60)
+                if change_at is not None:
+                    self.scheduler.schedule_at((self, "race_guide_filters"), self.upcoming_races_panel,
+                                               change_at + self.scheduler.tick_margin, self.apply_race_guide_filters)
+
+    def display_upcoming_races_error(self, e):
+            logger.error("Błąd podczas pobierania informacji o nadchodzących wyścigach: %s", e, exc_info=e)
+            self.reveal_upcoming_races()
+
+    def reveal_upcoming_races(self):
+            self.upcoming_races_panel.show()
+            self.stats_view.hide()
+            self.rating_label.hide()
+            self.status_label.hide()
+            self.world_ranking_browser.hide()
+            self.upcoming_races_view.scrollToTop()
             self.adjustSize()
+
     def convert_to_local_time(self, time_str):
-        time_str = time_str[:-1] + "+0000"
-        time_utc = datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S%z")
-        time_local = time_utc.astimezone(pytz.timezone('Europe/Warsaw'))
-        return time_local.strftime("%Y-%m-%d %H:%M:%S")
+        return self.time_converter.format_local(time_str)
     
     def update_current_time(self):
-        current_time_utc = QDateTime.currentDateTimeUtc()
-        current_time_gmt_plus_one = current_time_utc.addSecs(3600)
-        current_time_str = current_time_gmt_plus_one.toString("yyyy-MM-dd HH:mm:ss")
-
-        elapsed_seconds = self.last_api_update_time.secsTo(current_time_utc)
-        if elapsed_seconds >= 0:
-            self.upcoming_races_label.setText(f"Aktualny czas: {current_time_str}")
-            self.upcoming_races_label.setAlignment(Qt.AlignCenter)
-
-    def start_timer(self):
-        self.timer.start()
-
-    def stop_timer(self):
-        self.timer.stop()
+        current_time_str = self.time_converter.now_local().strftime(self.time_converter.display_format)
+        self.upcoming_races_label.setText(f"Aktualny czas: {current_time_str}")
+
+    def update_next_race_countdown(self):
+        if self.race_guide_index is None:
+            return
+        now = time.time()
+        position = self.race_guide_index.next_session(now, self.race_guide_series_filter())
+        if position is None:
+            self.current_time_label.setText("Brak nadchodzących wyścigów")
+            return
+        series_id = self.race_guide_index.sessions[position]['series_id']
+        series_name = self.series_catalog.lookup(series_id)
+        minutes, seconds = divmod(int(self.race_guide_index.starts[position] - now), 60)
+        hours, minutes = divmod(minutes, 60)
+        self.current_time_label.setText(f"Następny wyścig: {series_name} za {hours:02d}:{minutes:02d}:{seconds:02d}")
 
     def load_credentials(self):
         self.username = keyring.get_password("SimracingDataApp", "iRacingUsername")
         self.password = keyring.get_password("SimracingDataApp", "iRacingPassword")
+        self.iracing_session.set_credentials(self.username, self.password)
     
     def save_credentials(self):
         keyring.set_password("SimracingDataApp", "iRacingUsername", self.username)
@@ -636,6 +1062,7 @@ class IRacingOptionsWindow(QDialog):
         login_dialog = LoginDialog(self)
         if login_dialog.exec() == QDialog.Accepted:
             self.username, self.password = login_dialog.get_credentials()
+            self.iracing_session.set_credentials(self.username, self.password)
             self.save_credentials()
             self.show_stats()
 class DeleteMyData:
@@ -643,9 +1070,9 @@ class DeleteMyData:
         try:
             keyring.delete_password('SimracingDataApp', 'iRacingUsername')
             keyring.delete_password('SimracingDataApp', 'iRacingPassword')
-            print("Dane logowania wyczyszczone.")
-        except keyring.errors.PasswordDeleteError as e:
-            print("Dane logowania nie zostały podane.")
+            logger.info("Dane logowania wyczyszczone.")
+        except keyring.errors.PasswordDeleteError:
+            logger.info("Dane logowania nie zostały podane.")
 
     def closeEvent(self, event):
         self.clear_credentials()
@@ -677,8 +1104,81 @@ class LoginDialog(QDialog):
         username = self.username_lineedit.text()
         password = self.password_lineedit.text()
         return username, password
-        
+
+class MetricsWindow(QDialog):
+    def __init__(self, instrumentation, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pomiary wydajności")
+        self.resize(900, 600)
+        self.instrumentation = instrumentation
+
+        layout = QVBoxLayout(self)
+        self.spans_table = QTableWidget(self)
+        self.spans_table.setColumnCount(7)
+        self.spans_table.setHorizontalHeaderLabels(["Pomiar", "Liczba", "p50 [ms]", "p95 [ms]", "max [ms]",
+                                                    "Wiersze", "Błędy"])
+        layout.addWidget(self.spans_table)
+        self.caches_table = QTableWidget(self)
+        self.caches_table.setColumnCount(5)
+        self.caches_table.setHorizontalHeaderLabels(["Cache", "Trafienia", "Nieaktualne", "Chybienia", "Skuteczność"])
+        layout.addWidget(self.caches_table)
+
+        buttons_layout = QHBoxLayout()
+        refresh_button = QPushButton("Odśwież")
+        refresh_button.clicked.connect(self.refresh)
+        buttons_layout.addWidget(refresh_button)
+        export_button = QPushButton("Zapisz do pliku")
+        export_button.clicked.connect(self.export)
+        buttons_layout.addWidget(export_button)
+        self.profile_button = QPushButton()
+        self.profile_button.clicked.connect(self.toggle_profiling)
+        buttons_layout.addWidget(self.profile_button)
+        layout.addLayout(buttons_layout)
+        self.refresh()
+
+    def refresh(self):
+        snapshot = self.instrumentation.snapshot()
+        self.spans_table.setRowCount(0)
+        for row, (name, summary) in enumerate(snapshot["spans"].items()):
+            self.spans_table.insertRow(row)
+            values = [name, summary["count"], summary["p50_seconds"], summary["p95_seconds"], summary["max_seconds"],
+                      summary["rows"], summary["errors"]]
+            for column, value in enumerate(values):
+                text = f"{value * 1000:.1f}" if isinstance(value, float) else str(value)
+                self.spans_table.setItem(row, column, QTableWidgetItem(text))
+        self.caches_table.setRowCount(0)
+        for row, (name, summary) in enumerate(snapshot["caches"].items()):
+            self.caches_table.insertRow(row)
+            hit_rate = "-" if summary["hit_rate"] is None else f"{summary['hit_rate']:.0%}"
+            for column, text in enumerate([name, str(summary["hits"]), str(summary["stale"]), str(summary["misses"]),
+                                           hit_rate]):
+                self.caches_table.setItem(row, column, QTableWidgetItem(text))
+        self.spans_table.resizeColumnsToContents()
+        self.caches_table.resizeColumnsToContents()
+        self.profile_button.setText("Zatrzymaj profilowanie" if self.instrumentation.profiling
+                                    else "Włącz profilowanie (cProfile)")
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Zapisz pomiary", "metrics.json",
+                                              "JSON (*.json);;Prometheus (*.prom)")
+        if path:
+            self.instrumentation.write(path)
+
+    def toggle_profiling(self):
+        if not self.instrumentation.profiling:
+            self.instrumentation.start_profiling()
+        else:
+            path, _ = QFileDialog.getSaveFileName(self, "Zapisz profil", "profile.prof", "cProfile (*.prof)")
+            self.instrumentation.stop_profiling(path)
+        self.refresh()
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Profil i pomiary z całego uruchomienia można zapisać przy wyjściu, bez otwierania okna pomiarów
+    profile_path = os.environ.get("SIMRACING_PROFILE")
+    metrics_path = os.environ.get("SIMRACING_METRICS")
+    if profile_path:
+        instrumentation.start_profiling()
     app = QApplication([])
 
     main_window = MainWindow()
@@ -686,5 +1186,13 @@ if __name__ == "__main__":
 
     my_app = DeleteMyData()
     app.aboutToQuit.connect(my_app.clear_credentials)
+    # Baza i cache powstają dopiero na ekranach, które ich potrzebują - zamykamy tylko te, które zostały otwarte
+    app.aboutToQuit.connect(ApiTaskExecutor.shutdown)
+    for service in (DataStorage, ResponseCache):
+        app.aboutToQuit.connect(lambda service=service: service.shared_instance and service.shared_instance.close())
+    if profile_path:
+        app.aboutToQuit.connect(lambda: instrumentation.stop_profiling(profile_path))
+    if metrics_path:
+        app.aboutToQuit.connect(lambda: instrumentation.write(metrics_path))
 
     app.exec()
\ No newline at end of file
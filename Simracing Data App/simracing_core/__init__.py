@@ -0,0 +1,33 @@
+from .exporter import ResultExporter
+from .importer import ImportReport, ResultImporter
+from .instrumentation import Instrumentation
+from .iracing import IRacingDataFetcher, IRacingDriverBatch, IRacingHistorySync, IRacingSession, ResponseCache
+from .race_guide import RaceGuideIndex, TimeConverter
+from .ranking import WorldRanking
+from .ratings import RatingEngine, RatingState
+from .records import Catalog, IRacingRaceResult, RaceResult, max_field_strength, validate_result
+from .storage import ConnectionPool, DataStorage
+
+__all__ = [
+    "Catalog",
+    "ConnectionPool",
+    "DataStorage",
+    "ImportReport",
+    "Instrumentation",
+    "IRacingDataFetcher",
+    "IRacingDriverBatch",
+    "IRacingHistorySync",
+    "IRacingRaceResult",
+    "IRacingSession",
+    "RaceGuideIndex",
+    "RaceResult",
+    "RatingEngine",
+    "RatingState",
+    "ResponseCache",
+    "ResultExporter",
+    "ResultImporter",
+    "TimeConverter",
+    "WorldRanking",
+    "max_field_strength",
+    "validate_result",
+]
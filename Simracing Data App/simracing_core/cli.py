@@ -0,0 +1,208 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from .exporter import ResultExporter, export_tables
+from .importer import ResultImporter
+from .instrumentation import Instrumentation
+from .iracing import IRacingDataFetcher, IRacingDriverBatch, IRacingHistorySync, IRacingSession, ResponseCache
+from .lazy import LazyModule
+from .storage import DataStorage
+
+keyring = LazyModule("keyring")
+
+def load_credentials(args):
+    # Na serwerze bez pęku kluczy dane logowania podaje się w zmiennych środowiskowych
+    username = args.username or os.environ.get("IRACING_USERNAME")
+    password = args.password or os.environ.get("IRACING_PASSWORD")
+    if not username or not password:
+        username = username or keyring.get_password("SimracingDataApp", "iRacingUsername")
+        password = password or keyring.get_password("SimracingDataApp", "iRacingPassword")
+    if not username or not password:
+        raise SystemExit("Brak danych logowania do iRacing (--username/--password lub IRACING_USERNAME/IRACING_PASSWORD)")
+    return username, password
+
+
+def write_records(records, fields, output_format, output):
+    if output_format == "json":
+        json.dump(records, output, ensure_ascii=False, indent=2)
+        output.write("\n")
+    else:
+        writer = csv.DictWriter(output, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def import_command(args, data_storage):
+    importer = ResultImporter(data_storage, chunk_size=args.chunk_size, default_game=args.game)
+    try:
+        report = importer.import_file(args.path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    print(f"Przeczytano wierszy: {report.read_rows}, zaimportowano: {report.imported_rows}, "
+          f"duplikatów: {report.duplicate_rows}, błędnych: {report.invalid_rows}")
+    for row_number, message in report.errors:
+        print(f"  wiersz {row_number}: {message}", file=sys.stderr)
+
+
+def sync_command(args, data_storage):
+    session = IRacingSession()
+    session.set_credentials(*load_credentials(args))
+    cache = ResponseCache(args.cache_database)
+    try:
+        history_sync = IRacingHistorySync(IRacingDataFetcher(session, cache), data_storage)
+        new_races = history_sync.sync(args.cust_id)
+    finally:
+        cache.close()
+    rating = data_storage.iracing_rating(args.cust_id)
+    print(f"Nowych wyścigów: {new_races}, poziom umiejętności: {rating.skill:.0f}, "
+          f"ocena bezpieczeństwa: {rating.safety:.2f}")
+
+
+def league_command(args, data_storage):
+    session = IRacingSession()
+    session.set_credentials(*load_credentials(args))
+    cache = ResponseCache(args.cache_database)
+    try:
+        batch = IRacingDriverBatch(IRacingDataFetcher(session, cache), data_storage, max_workers=args.workers)
+        race_results, errors = batch.fetch(args.cust_ids)
+    finally:
+        cache.close()
+    fields = ["cust_id", *DataStorage.iracing_columns]
+    records = [{field: getattr(result, field) for field in fields} for result in race_results]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as output:
+            write_records(records, fields, args.format, output)
+    else:
+        write_records(records, fields, args.format, sys.stdout)
+    for cust_id, error in errors.items():
+        print(f"  kierowca {cust_id}: {error}", file=sys.stderr)
+    print(f"Kierowców: {len(set(args.cust_ids)) - len(errors)}, wyścigów: {len(records)}, błędów: {len(errors)}",
+          file=sys.stderr)
+
+
+def stats_command(args, data_storage):
+    group_column = {"car": "car_model", "track": "track_name"}[args.by]
+    stats = data_storage.aggregate_results(group_column, args.game)
+    fields = [group_column, "races_count", "avg_incidents", "avg_position", "min_incidents", "max_incidents",
+              "best_position", "worst_position", "recent_avg_incidents", "recent_avg_position"]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as output:
+            write_records(stats, fields, args.format, output)
+    else:
+        write_records(stats, fields, args.format, sys.stdout)
+
+
+def ratings_command(args, data_storage):
+    if args.recompute:
+        data_storage.recompute_all_ratings()
+    subjects = [args.subject] if args.subject else data_storage.rating_subjects()
+    records = []
+    for subject in subjects:
+        rating = data_storage.rating(subject)
+        records.append({"subject": subject, "skill": round(rating.skill, 1), "safety": round(rating.safety, 2),
+                        "races_count": rating.races_count})
+    write_records(records, ["subject", "skill", "safety", "races_count"], args.format, sys.stdout)
+
+
+def export_command(args, data_storage):
+    exporter = ResultExporter(data_storage, chunk_size=args.chunk_size)
+    query = {
+        "columns": args.columns.split(",") if args.columns else None,
+        "filters": {"game": args.game, "car": args.car, "track": args.track, "cust_id": args.cust_id,
+                    "series": args.series_id},
+        "since": args.since,
+        "until": args.until,
+    }
+    try:
+        if args.format == "parquet":
+            if not args.output:
+                raise SystemExit("Eksport do Parquet wymaga --output")
+            exported_rows = exporter.export_parquet(args.output, args.table, **query)
+        elif args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as output:
+                exported_rows = exporter.export_csv(output, args.table, **query)
+        else:
+            exported_rows = exporter.export_csv(sys.stdout, args.table, **query)
+    except (ValueError, RuntimeError) as e:
+        raise SystemExit(str(e))
+    print(f"Wyeksportowano wierszy: {exported_rows}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="simracing_core", description="Zadania wsadowe Simracing Data App bez GUI")
+    parser.add_argument("--database", default="data.db", help="plik bazy wyników (domyślnie data.db)")
+    parser.add_argument("--metrics", help="zapisz pomiary czasu do pliku JSON (.prom - format Prometheusa)")
+    parser.add_argument("--profile", help="zapisz profil cProfile całego polecenia do pliku")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="dodaj wyniki z pliku CSV, JSON lub JSON Lines")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--game", default="Project Cars 2", help="gra dla wierszy bez kolumny game")
+    import_parser.add_argument("--chunk-size", type=int, default=10000)
+    import_parser.set_defaults(handler=import_command)
+
+    sync_parser = commands.add_parser("sync", help="pobierz nowe wyścigi kierowcy z iRacing")
+    sync_parser.add_argument("--cust-id", type=int, required=True)
+    sync_parser.add_argument("--username")
+    sync_parser.add_argument("--password")
+    sync_parser.add_argument("--cache-database", default="api_cache.db")
+    sync_parser.set_defaults(handler=sync_command)
+
+    league_parser = commands.add_parser("league", help="pobierz naraz ostatnie wyścigi wielu kierowców iRacing")
+    league_parser.add_argument("cust_ids", nargs="+", type=int, metavar="cust_id")
+    league_parser.add_argument("--workers", type=int, default=8, help="liczba równoległych zapytań (domyślnie 8)")
+    league_parser.add_argument("--username")
+    league_parser.add_argument("--password")
+    league_parser.add_argument("--cache-database", default="api_cache.db")
+    league_parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    league_parser.add_argument("--output", help="plik wyjściowy (domyślnie standardowe wyjście)")
+    league_parser.set_defaults(handler=league_command)
+
+    stats_parser = commands.add_parser("stats", help="wyeksportuj statystyki według auta lub toru")
+    stats_parser.add_argument("--by", choices=("car", "track"), default="car")
+    stats_parser.add_argument("--game", default="Project Cars 2")
+    stats_parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    stats_parser.add_argument("--output", help="plik wyjściowy (domyślnie standardowe wyjście)")
+    stats_parser.set_defaults(handler=stats_command)
+
+    export_parser = commands.add_parser("export", help="wyeksportuj wyniki do CSV lub Parquet")
+    export_parser.add_argument("--table", choices=sorted(export_tables), default="results")
+    export_parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    export_parser.add_argument("--output", help="plik wyjściowy (CSV domyślnie na standardowe wyjście)")
+    export_parser.add_argument("--columns", help="lista kolumn oddzielona przecinkami")
+    export_parser.add_argument("--game")
+    export_parser.add_argument("--car", help="model auta (results) albo car_id (iracing_results)")
+    export_parser.add_argument("--track")
+    export_parser.add_argument("--cust-id", type=int)
+    export_parser.add_argument("--series-id", type=int)
+    export_parser.add_argument("--since", help="data początkowa ISO 8601 (włącznie)")
+    export_parser.add_argument("--until", help="data końcowa ISO 8601 (bez niej)")
+    export_parser.add_argument("--chunk-size", type=int, default=50000)
+    export_parser.set_defaults(handler=export_command)
+
+    ratings_parser = commands.add_parser("ratings", help="pokaż poziom umiejętności i ocenę bezpieczeństwa")
+    ratings_parser.add_argument("--subject", help='gra albo "iRacing:<cust_id>"')
+    ratings_parser.add_argument("--recompute", action="store_true", help="przelicz oceny od nowa z całej historii")
+    ratings_parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    ratings_parser.set_defaults(handler=ratings_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    instrumentation = Instrumentation.shared()
+    if args.profile:
+        instrumentation.start_profiling()
+    data_storage = DataStorage(args.database)
+    try:
+        with instrumentation.span(f"cli.{args.command}"):
+            args.handler(args, data_storage)
+    finally:
+        data_storage.close()
+        if args.profile:
+            instrumentation.stop_profiling(args.profile)
+        if args.metrics:
+            instrumentation.write(args.metrics)
@@ -0,0 +1,128 @@
+import csv
+from datetime import datetime, timezone
+
+from .lazy import LazyModule
+
+pa = LazyModule("pyarrow")
+pc = LazyModule("pyarrow.compute")
+pq = LazyModule("pyarrow.parquet")
+
+
+class ExportTable:
+    def __init__(self, name, columns, filter_columns, date_column, date_format, order_by):
+        self.name = name
+        # Nazwa kolumny -> typ w Parquet ("int", "text" albo "timestamp"); wszystkie daty tabeli mają date_format
+        self.columns = columns
+        self.filter_columns = filter_columns
+        self.date_column = date_column
+        self.date_format = date_format
+        self.order_by = order_by
+
+
+export_tables = {
+    "results": ExportTable(
+        "results",
+        {"id": "int", "created_at": "timestamp", "game": "text", "car_model": "text", "track_name": "text",
+         "incidents_count": "int", "position_in_race": "int", "field_strength": "int"},
+        {"game": "game", "car": "car_model", "track": "track_name"},
+        "created_at", "%Y-%m-%d %H:%M:%S", "id",
+    ),
+    "iracing_results": ExportTable(
+        "iracing_results",
+        {"cust_id": "int", "subsession_id": "int", "series_id": "int", "series_name": "text",
+         "start_time": "timestamp", "end_time": "timestamp", "track_name": "text", "car_id": "int",
+         "start_position": "int", "finish_position": "int", "incidents_count": "int", "points": "int",
+         "strength_of_field": "int", "oldi_rating": "int", "newi_rating": "int", "laps_led": "int"},
+        {"cust_id": "cust_id", "car": "car_id", "track": "track_name", "series": "series_id"},
+        "start_time", "%Y-%m-%dT%H:%M:%SZ", "cust_id, start_time",
+    ),
+}
+
+
+class ResultExporter:
+    def __init__(self, data_storage, chunk_size=50000):
+        self.data_storage = data_storage
+        self.chunk_size = chunk_size
+
+    def build_query(self, table, columns=None, filters=None, since=None, until=None):
+        columns = list(columns or table.columns)
+        unknown_columns = [column for column in columns if column not in table.columns]
+        if unknown_columns:
+            raise ValueError(f"Tabela {table.name} nie ma kolumn: {', '.join(unknown_columns)}")
+        conditions = []
+        params = []
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            if name not in table.filter_columns:
+                raise ValueError(f"Tabeli {table.name} nie da się filtrować po {name}")
+            conditions.append(f"{table.filter_columns[name]} = ?")
+            params.append(value)
+        # Daty porównujemy jako tekst, więc granice zapisujemy w formacie kolumny
+        for operator, bound in ((">=", since), ("<", until)):
+            if bound is not None:
+                conditions.append(f"{table.date_column} {operator} ?")
+                params.append(self.format_date(bound, table.date_format))
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {', '.join(columns)} FROM {table.name} {where_clause} ORDER BY {table.order_by}"
+        return query, params, columns
+
+    def format_date(self, value, date_format):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime(date_format)
+
+    def iter_chunks(self, table_name, columns=None, filters=None, since=None, until=None):
+        # Kursor SQLite zwraca wiersze krokami - w pamięci jest zawsze najwyżej jeden fragment
+        table = export_tables[table_name]
+        query, params, columns = self.build_query(table, columns, filters, since, until)
+        with self.data_storage.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            while rows := cursor.fetchmany(self.chunk_size):
+                yield columns, rows
+
+    def export_csv(self, output, table_name, **query):
+        writer = csv.writer(output)
+        exported_rows = 0
+        header_written = False
+        for columns, rows in self.iter_chunks(table_name, **query):
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            exported_rows += len(rows)
+        if not header_written:
+            writer.writerow(self.build_query(export_tables[table_name], query.get("columns"))[2])
+        return exported_rows
+
+    def export_parquet(self, path, table_name, **query):
+        try:
+            schema = self.parquet_schema(export_tables[table_name], query.get("columns"))
+        except ImportError as e:
+            raise RuntimeError("Eksport do Parquet wymaga pakietu pyarrow") from e
+        table = export_tables[table_name]
+        exported_rows = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for columns, rows in self.iter_chunks(table_name, **query):
+                arrays = [self.parquet_array([row[index] for row in rows], table, column, schema.field(column).type)
+                          for index, column in enumerate(columns)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                exported_rows += len(rows)
+        return exported_rows
+
+    def parquet_schema(self, table, columns=None):
+        types = {"int": pa.int64(), "text": pa.string(), "timestamp": pa.timestamp("s", tz="UTC")}
+        return pa.schema([(column, types[table.columns[column]]) for column in columns or table.columns])
+
+    def parquet_array(self, values, table, column, arrow_type):
+        if table.columns[column] == "int":
+            # Starsze wyniki iRacing mają w kolumnach liczbowych pusty tekst zamiast NULL
+            return pa.array([value if isinstance(value, int) else None for value in values], type=arrow_type)
+        if table.columns[column] == "text":
+            return pa.array(values, type=arrow_type)
+        # Daty są w bazie tekstem - w Parquet zapisujemy je jako znaczniki czasu UTC, gotowe dla pandas
+        parsed = pc.strptime(pa.array(values, type=pa.string()), format=table.date_format, unit="s",
+                             error_is_null=True)
+        return pc.assume_timezone(parsed, "UTC")
@@ -0,0 +1,215 @@
+import csv
+import json
+import math
+import re
+from datetime import datetime, timezone
+from itertools import islice
+
+from .records import validate_result
+
+# Kolumny pliku w kolejności kolumn tabeli tymczasowej i tabeli results
+import_columns = ("game", "created_at", "car_model", "track_name", "incidents_count", "position_in_race",
+                  "field_strength")
+
+canonical_timestamp = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d")
+# Zakres INTEGER w SQLite - większa liczba przerwałaby executemany całego fragmentu
+sqlite_integer_range = range(-1 << 63, 1 << 63)
+
+
+def text_value(value):
+    return "" if value is None else str(value).strip()
+
+
+def integer_value(value, default):
+    # CSV daje tekst, JSON liczby; arkusze potrafią zapisać pozycję jako "3.0"
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except (ValueError, OverflowError):
+        # "inf" i "nan" to poprawne float, ale nie liczby wyścigu
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"Nieprawidłowa liczba: {value}")
+        number = int(number)
+    if number not in sqlite_integer_range:
+        raise ValueError(f"Liczba poza zakresem: {value}")
+    return number
+
+
+class MalformedRecord:
+    # Wiersz, którego nie dało się odczytać - trafia do raportu jak wiersz z błędnymi wartościami
+    __slots__ = ("message",)
+
+    def __init__(self, message):
+        self.message = message
+
+
+class ImportReport:
+    max_errors = 20
+
+    def __init__(self):
+        self.read_rows = 0
+        self.imported_rows = 0
+        self.duplicate_rows = 0
+        self.invalid_rows = 0
+        # Zapamiętujemy tylko kilka pierwszych błędów, żeby raport nie rósł razem z plikiem
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.invalid_rows += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, message))
+
+
+class ResultImporter:
+    read_size = 1 << 16
+    # Przy milionie wierszy większość czasu to aktualizacja indeksów results - większy cache stron
+    # na czas importu (w KiB, jak w PRAGMA cache_size) skraca ją o około jedną trzecią
+    cache_size_kib = 131072
+    json_separator = re.compile(r"[\s,]*")
+    # Żaden wynik nie zajmuje tyle - dłuższy obiekt to uszkodzony plik, a nie powód, by wczytać go w całości
+    max_record_size = 1 << 20
+
+    def __init__(self, data_storage, chunk_size=10000, default_game="Project Cars 2"):
+        self.data_storage = data_storage
+        self.chunk_size = chunk_size
+        self.default_game = default_game
+
+    def read_records(self, path):
+        # Generatory czytają plik fragmentami - w pamięci jest najwyżej jeden fragment, a nie cały plik
+        lower_path = path.lower()
+        with open(path, encoding="utf-8-sig", newline="") as source:
+            if lower_path.endswith((".jsonl", ".ndjson")):
+                for line_number, line in enumerate(source, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield line_number, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield line_number, MalformedRecord(f"Błędny JSON: {e.msg}")
+            elif lower_path.endswith(".json"):
+                yield from enumerate(self.read_json_array(source), 1)
+            else:
+                reader = csv.DictReader(source)
+                for record in reader:
+                    yield reader.line_num, record
+
+    def read_json_array(self, source):
+        decoder = json.JSONDecoder()
+        buffer = source.read(self.read_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("Plik JSON musi zawierać listę wyników")
+        position = 1
+        at_end_of_file = False
+        while True:
+            position = self.json_separator.match(buffer, position).end()
+            if buffer.startswith("]", position):
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if at_end_of_file or len(buffer) - position > self.max_record_size:
+                    # Po błędzie składni nie wiadomo, gdzie zaczyna się następny wynik - dalszą część pliku
+                    # pomijamy, a wcześniej odczytane wiersze zostają zaimportowane
+                    yield MalformedRecord(f"Błędny lub niekompletny JSON: {e.msg}, dalsza część pliku pominięta")
+                    return
+                # Obiekt jest przecięty końcem fragmentu - doklejamy następny i dekodujemy od początku obiektu
+                chunk = source.read(self.read_size)
+                at_end_of_file = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
+
+    def parse_record(self, record):
+        get = record.get
+        track_name = text_value(get("track_name"))
+        car_model = text_value(get("car_model"))
+        position_in_race = integer_value(get("position_in_race"), 0)
+        incidents_count = integer_value(get("incidents_count"), 0)
+        field_strength = integer_value(get("field_strength"), 0)
+        error = validate_result(track_name, car_model, position_in_race, incidents_count, field_strength)
+        if error:
+            raise ValueError(error)
+        created_at = text_value(get("created_at"))
+        if not created_at:
+            # Data jest częścią tożsamości wyniku - bez niej ponowny import tego samego pliku dodałby go drugi raz
+            raise ValueError("Brak daty wyścigu (created_at).")
+        if not canonical_timestamp.fullmatch(created_at):
+            parsed = datetime.fromisoformat(created_at)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc)
+            # Ten sam format co CURRENT_TIMESTAMP i formularz, więc daty sortują się poprawnie jako tekst
+            created_at = parsed.strftime("%Y-%m-%d %H:%M:%S")
+        return (text_value(get("game")) or self.default_game, created_at, car_model, track_name, incidents_count,
+                position_in_race, field_strength)
+
+    def valid_rows(self, path, report):
+        for row_number, record in self.read_records(path):
+            report.read_rows += 1
+            if isinstance(record, MalformedRecord):
+                report.add_error(row_number, record.message)
+                continue
+            if not isinstance(record, dict):
+                report.add_error(row_number, "Wiersz nie jest obiektem")
+                continue
+            try:
+                yield self.parse_record(record)
+            except (TypeError, ValueError, OverflowError) as e:
+                report.add_error(row_number, str(e))
+
+    def import_file(self, path):
+        report = ImportReport()
+        rows = self.valid_rows(path, report)
+        with self.data_storage.pool.connection() as conn:
+            previous_cache_size = conn.execute('PRAGMA cache_size').fetchone()[0]
+            conn.execute(f'PRAGMA cache_size = -{self.cache_size_kib}')
+            try:
+                rating_states = self.insert_rows(conn, rows, report)
+            finally:
+                conn.execute(f'PRAGMA cache_size = {previous_cache_size}')
+        self.data_storage.rating_states.update(rating_states)
+        if report.imported_rows:
+            self.data_storage.mark_changed()
+        return report
+
+    def insert_rows(self, conn, rows, report):
+        columns = ", ".join(import_columns)
+        duplicate_condition = " AND ".join(f"results.{column} = incoming.{column}" for column in import_columns)
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS import_results ({columns})')
+            cursor.execute('DELETE FROM import_results')
+            # Plik trafia do tabeli tymczasowej fragmentami - w pamięci jest najwyżej jeden fragment
+            while chunk := list(islice(rows, self.chunk_size)):
+                cursor.executemany(f'INSERT INTO import_results VALUES ({", ".join("?" * len(import_columns))})',
+                                   chunk)
+            last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM results').fetchone()[0]
+            before = conn.total_changes
+            # Identyczne wiersze liczymy, a nie zwijamy: n-ta kopia wyniku trafia do bazy tylko wtedy, gdy baza
+            # ma mniej niż n takich wyników. Ponowny import pliku niczego nie dodaje, a dwa takie same wyścigi
+            # z jednego pliku zostają dwoma wynikami. Bez statystyk planer wybiera indeks z największą liczbą
+            # kolumn (auto/tor), który przy milionie wyników zwraca setki kandydatów - data wyścigu zawęża je
+            # do kilku
+            cursor.execute(f'''
+                INSERT INTO results ({columns})
+                SELECT {columns} FROM (
+                    SELECT rowid AS file_order, {columns},
+                           ROW_NUMBER() OVER (PARTITION BY {columns} ORDER BY rowid) AS occurrence
+                    FROM import_results
+                ) AS incoming
+                WHERE occurrence > (SELECT COUNT(*) FROM results INDEXED BY idx_results_game_created
+                                    WHERE {duplicate_condition})
+                ORDER BY file_order
+            ''')
+            report.imported_rows = conn.total_changes - before
+            cursor.execute('DROP TABLE import_results')
+            report.duplicate_rows = report.read_rows - report.invalid_rows - report.imported_rows
+            # AUTOINCREMENT nadaje nowym wierszom identyfikatory większe od wszystkich wcześniejszych
+            games = [game for game, in cursor.execute('SELECT DISTINCT game FROM results WHERE id > ?', (last_id,))]
+            # Wyniki z arkuszy są zwykle starsze niż te w bazie, więc oceny i podsumowania liczymy od nowa
+            # w tej samej transakcji co import
+            for game in games:
+                self.data_storage.rebuild_result_stats(cursor, game)
+            return {game: self.data_storage.recompute_game_rating(cursor, game) for game in games}
@@ -0,0 +1,183 @@
+import cProfile
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def payload_rows(payload):
+    # Odpowiedzi irDataClient to lista albo słownik z jedną listą (races, sessions, ...)
+    if isinstance(payload, list):
+        return len(payload)
+    if isinstance(payload, dict):
+        for value in payload.values():
+            if isinstance(value, list):
+                return len(value)
+    return None
+
+
+class Span:
+    __slots__ = ("name", "rows")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        # Kod wewnątrz bloku "with" może uzupełnić liczbę wierszy, gdy już ją zna
+        self.rows = rows
+
+
+class LatencyHistogram:
+    def __init__(self, window=512):
+        # Percentyle liczymy z ostatnich pomiarów, żeby stare, wolne starty nie zasłaniały obecnego stanu
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+
+    def add(self, seconds, rows=None, error=False):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total_seconds += seconds
+        if rows is not None:
+            self.rows += rows
+        if error:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_seconds": self.total_seconds,
+            "p50_seconds": self.percentile(0.5),
+            "p95_seconds": self.percentile(0.95),
+            "max_seconds": max(self.samples, default=None),
+            "window": len(self.samples),
+        }
+
+
+class CacheCounter:
+    def __init__(self):
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    def summary(self):
+        requests = self.hits + self.stale + self.misses
+        return {"hits": self.hits, "stale": self.stale, "misses": self.misses,
+                "hit_rate": (self.hits + self.stale) / requests if requests else None}
+
+
+class Instrumentation:
+    shared_instance = None
+
+    def __init__(self, window=512):
+        self.window = window
+        self.histograms = {}
+        self.caches = {}
+        self.started_at = time.time()
+        self.profiler = None
+        # Pomiary przychodzą i z wątku GUI, i z wątków zapytań do API
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        if cls.shared_instance is None:
+            cls.shared_instance = cls()
+        return cls.shared_instance
+
+    @contextmanager
+    def span(self, name, rows=None):
+        span = Span(name, rows)
+        started_at = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            self.record(name, time.perf_counter() - started_at, span.rows, error=True)
+            raise
+        self.record(name, time.perf_counter() - started_at, span.rows)
+
+    def record(self, name, seconds, rows=None, error=False):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram(self.window)
+            histogram.add(seconds, rows, error)
+
+    def record_cache(self, name, hit, fresh=True):
+        with self.lock:
+            counter = self.caches.get(name)
+            if counter is None:
+                counter = self.caches[name] = CacheCounter()
+            if not hit:
+                counter.misses += 1
+            elif fresh:
+                counter.hits += 1
+            else:
+                counter.stale += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "started_at": self.started_at,
+                "captured_at": time.time(),
+                "spans": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "caches": {name: counter.summary() for name, counter in sorted(self.caches.items())},
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = ["# TYPE simracing_span_seconds summary"]
+        for name, summary in snapshot["spans"].items():
+            for quantile, key in (("0.5", "p50_seconds"), ("0.95", "p95_seconds")):
+                if summary[key] is not None:
+                    lines.append(f'simracing_span_seconds{{span="{name}",quantile="{quantile}"}} {summary[key]:.6f}')
+            lines.append(f'simracing_span_seconds_sum{{span="{name}"}} {summary["total_seconds"]:.6f}')
+            lines.append(f'simracing_span_seconds_count{{span="{name}"}} {summary["count"]}')
+        lines.append("# TYPE simracing_span_errors_total counter")
+        lines.extend(f'simracing_span_errors_total{{span="{name}"}} {summary["errors"]}'
+                     for name, summary in snapshot["spans"].items())
+        lines.append("# TYPE simracing_span_rows_total counter")
+        lines.extend(f'simracing_span_rows_total{{span="{name}"}} {summary["rows"]}'
+                     for name, summary in snapshot["spans"].items())
+        lines.append("# TYPE simracing_cache_requests_total counter")
+        for name, summary in snapshot["caches"].items():
+            for result in ("hits", "stale", "misses"):
+                lines.append(f'simracing_cache_requests_total{{cache="{name}",result="{result}"}} {summary[result]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # Format wybieramy po rozszerzeniu: .prom/.txt dla Prometheusa, wszystko inne to JSON
+        with open(path, "w", encoding="utf-8") as output:
+            if path.lower().endswith((".prom", ".txt")):
+                output.write(self.prometheus_text())
+            else:
+                json.dump(self.snapshot(), output, indent=2)
+
+    @property
+    def profiling(self):
+        return self.profiler is not None
+
+    def start_profiling(self):
+        # cProfile obejmuje tylko wątek, który go włączył - w aplikacji to wątek GUI, zapytania API
+        # w tle widać wtedy tylko w pomiarach czasu
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profiling(self, path=None):
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return None
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        return profiler
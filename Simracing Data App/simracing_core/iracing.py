@@ -0,0 +1,304 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone, timedelta
+
+from .instrumentation import Instrumentation, payload_rows
+from .lazy import LazyModule
+from .records import IRacingRaceResult
+from .storage import ConnectionPool
+
+iracing_client = LazyModule("iracingdataapi.client")
+
+
+class IRacingSession:
+    shared_instance = None
+    # Komunikaty RuntimeError z irDataClient, po których warto spróbować jeszcze raz
+    transient_errors = ("Login timed out", "Connection error")
+
+    def __init__(self, client_factory=None, max_retries=3, backoff_seconds=1.0):
+        # W testach można podać atrapę irDataClient zamiast prawdziwego klienta
+        self.client_factory = client_factory
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.username = None
+        self.password = None
+        self.client = None
+        self.lock = threading.Lock()
+        # Zapytania w toku z kilku wątków - każde zużyje jedno miejsce w limicie iRacing
+        self.requests_in_flight = 0
+        self.rate_limit_condition = threading.Condition()
+
+    @classmethod
+    def shared(cls):
+        if cls.shared_instance is None:
+            cls.shared_instance = cls()
+        return cls.shared_instance
+
+    def set_credentials(self, username, password):
+        with self.lock:
+            if (username, password) != (self.username, self.password):
+                self.username = username
+                self.password = password
+                self.client = None
+
+    def get_client(self):
+        # Jeden klient na całą aplikację - requests.Session w środku trzyma połączenia i ciasteczka logowania
+        with self.lock:
+            if self.client is None:
+                client_factory = self.client_factory or iracing_client.irDataClient
+                self.client = client_factory(username=self.username, password=self.password)
+            if not getattr(self.client, "authenticated", True):
+                # Logujemy się pod blokadą, żeby równoległe zapytania nie logowały się kilka razy.
+                # Po wygaśnięciu sesji irDataClient sam zaloguje się ponownie po odpowiedzi 401.
+                with Instrumentation.shared().span("api.login"):
+                    self.client._login()
+            return self.client
+
+    def wait_for_rate_limit(self, client):
+        # Limit z ostatniej odpowiedzi nie wie o zapytaniach, które właśnie lecą z innych wątków,
+        # więc zanim wyślemy kolejne, rezerwujemy dla niego miejsce
+        rate_limit = getattr(client, "rate_limit", None)
+        with self.rate_limit_condition:
+            while rate_limit is not None and getattr(rate_limit, "has_data", False) \
+                    and rate_limit.remaining <= self.requests_in_flight:
+                delay = rate_limit.reset - time.time()
+                if delay <= 0:
+                    break
+                # Koniec zapytania w toku budzi czekających - jego odpowiedź niesie nowy stan limitu
+                self.rate_limit_condition.wait(delay)
+            self.requests_in_flight += 1
+
+    def finish_request(self):
+        with self.rate_limit_condition:
+            self.requests_in_flight -= 1
+            self.rate_limit_condition.notify_all()
+
+    def call(self, method_name, **params):
+        # Czas obejmuje logowanie, czekanie na limit zapytań i ponowienia - tyle czeka użytkownik
+        with Instrumentation.shared().span(f"api.{method_name}") as span:
+            data = self.call_with_retries(method_name, params)
+            span.rows = payload_rows(data)
+            return data
+
+    def call_with_retries(self, method_name, params):
+        delay = self.backoff_seconds
+        for attempt in range(self.max_retries):
+            try:
+                client = self.get_client()
+                self.wait_for_rate_limit(client)
+                try:
+                    return getattr(client, method_name)(**params)
+                finally:
+                    self.finish_request()
+            except (OSError, RuntimeError) as e:
+                transient = isinstance(e, OSError) or (e.args and e.args[0] in self.transient_errors)
+                if not transient or attempt == self.max_retries - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+class ResponseCache:
+    shared_instance = None
+    # Czas ważności odpowiedzi w sekundach dla poszczególnych endpointów
+    default_ttls = {
+        "season_race_guide": 15 * 60,
+        "stats_member_recent_races": 10 * 60,
+    }
+
+    def __init__(self, database="api_cache.db", max_entries=200, max_memory_entries=16, ttls=None,
+                 default_ttl=5 * 60):
+        self.pool = ConnectionPool(database, max_connections=2)
+        self.max_entries = max_entries
+        self.max_memory_entries = max_memory_entries
+        self.ttls = dict(self.default_ttls, **(ttls or {}))
+        self.default_ttl = default_ttl
+        # Ostatnio używane odpowiedzi trzymamy już sparsowane, żeby nie dekodować JSON przy każdym kliknięciu
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.create_table()
+
+    @classmethod
+    def shared(cls):
+        if cls.shared_instance is None:
+            cls.shared_instance = cls()
+        return cls.shared_instance
+
+    def create_table(self):
+        with self.pool.connection() as conn, conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS api_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_api_cache_last_used ON api_cache (last_used)')
+
+    def make_key(self, endpoint, params):
+        return f"{endpoint}:{json.dumps(params, sort_keys=True)}"
+
+    def ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def is_fresh(self, endpoint, fetched_at):
+        return time.time() - fetched_at < self.ttl(endpoint)
+
+    def expires_at(self, endpoint, params):
+        # Kiedy odpowiedź przestanie być aktualna; sprawdzamy tylko pamięć, w której są ostatnio używane odpowiedzi
+        with self.lock:
+            entry = self.memory.get(self.make_key(endpoint, params))
+        return None if entry is None else entry[0] + self.ttl(endpoint)
+
+    def remember(self, cache_key, fetched_at, value):
+        self.memory[cache_key] = (fetched_at, value)
+        self.memory.move_to_end(cache_key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, endpoint, params):
+        # Zwraca (odpowiedź, czy_aktualna) - przeterminowana odpowiedź też jest zwracana, żeby można ją było od razu pokazać
+        cache_key = self.make_key(endpoint, params)
+        with self.lock:
+            entry = self.memory.get(cache_key)
+            if entry is not None:
+                self.memory.move_to_end(cache_key)
+        with self.pool.connection() as conn, conn:
+            if entry is None:
+                row = conn.execute('SELECT fetched_at, response FROM api_cache WHERE cache_key = ?',
+                                   (cache_key,)).fetchone()
+                if row is None:
+                    Instrumentation.shared().record_cache("api_cache", False)
+                    return None, False
+                entry = (row[0], json.loads(row[1]))
+                with self.lock:
+                    self.remember(cache_key, *entry)
+            conn.execute('UPDATE api_cache SET last_used = ? WHERE cache_key = ?', (time.time(), cache_key))
+        fresh = self.is_fresh(endpoint, entry[0])
+        Instrumentation.shared().record_cache("api_cache", True, fresh)
+        return entry[1], fresh
+
+    def put(self, endpoint, params, value):
+        cache_key = self.make_key(endpoint, params)
+        now = time.time()
+        with self.lock:
+            self.remember(cache_key, now, value)
+        with self.pool.connection() as conn, conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO api_cache (cache_key, endpoint, response, fetched_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (cache_key, endpoint, json.dumps(value), now, now))
+            conn.execute('''
+                DELETE FROM api_cache WHERE cache_key IN (
+                    SELECT cache_key FROM api_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def close(self):
+        self.pool.close()
+
+class IRacingDataFetcher:
+    def __init__(self, session, cache=None):
+        self.session = session
+        self.cache = cache
+
+    def fetch(self, endpoint, **params):
+        data = self.session.call(endpoint, **params)
+        if self.cache is not None:
+            self.cache.put(endpoint, params, data)
+        return data
+
+    def cached(self, endpoint, **params):
+        if self.cache is None:
+            return None, False
+        return self.cache.get(endpoint, params)
+
+    def cache_expires_at(self, endpoint, **params):
+        return None if self.cache is None else self.cache.expires_at(endpoint, params)
+
+    def recent_races(self, cust_id):
+        driver_info = self.fetch("stats_member_recent_races", cust_id=cust_id)
+        return IRacingRaceResult.from_payloads(driver_info['races'], cust_id)
+
+    def cached_recent_races(self, cust_id):
+        driver_info, fresh = self.cached("stats_member_recent_races", cust_id=cust_id)
+        if driver_info is None:
+            return None, False
+        return IRacingRaceResult.from_payloads(driver_info['races'], cust_id), fresh
+
+    def upcoming_sessions(self):
+        return self.fetch("season_race_guide")['sessions']
+
+    def cached_upcoming_sessions(self):
+        race_guide, fresh = self.cached("season_race_guide")
+        if race_guide is None:
+            return None, False
+        return race_guide['sessions'], fresh
+
+    def member_race_results(self, cust_id, finish_range_begin, finish_range_end):
+        # Wyniki z wyszukiwarki nie trafiają do cache - zapisuje je synchronizacja historii
+        results = self.session.call("result_search_series", cust_id=cust_id, finish_range_begin=finish_range_begin,
+                                    finish_range_end=finish_range_end, event_types=[5])
+        return IRacingRaceResult.from_payloads(results, cust_id)
+
+class IRacingDriverBatch:
+    # Ostatnie wyścigi wielu kierowców (liga, drużyna) pobierane równolegle przez ograniczoną pulę wątków.
+    # Wszystkie wątki używają jednej zalogowanej sesji, a IRacingSession pilnuje limitu zapytań
+    def __init__(self, fetcher, data_storage=None, max_workers=8):
+        self.fetcher = fetcher
+        self.data_storage = data_storage
+        self.max_workers = max_workers
+
+    def fetch(self, cust_ids):
+        # Zwraca (wyniki wszystkich kierowców od najnowszego, {cust_id: błąd}) - błąd jednego kierowcy nie przerywa reszty
+        cust_ids = list(dict.fromkeys(cust_ids))
+        results_by_driver = {}
+        errors = {}
+        with Instrumentation.shared().span("api.recent_races_batch") as span:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(cust_ids)))) as executor:
+                futures = {executor.submit(self.fetcher.recent_races, cust_id): cust_id for cust_id in cust_ids}
+                for future in as_completed(futures):
+                    try:
+                        results_by_driver[futures[future]] = future.result()
+                    except Exception as e:
+                        errors[futures[future]] = e
+            merged = [result for cust_id in cust_ids for result in results_by_driver.get(cust_id, ())]
+            merged.sort(key=lambda result: result.start_time, reverse=True)
+            span.rows = len(merged)
+        if self.data_storage is not None:
+            # Zapis do SQLite jest szybki w porównaniu z siecią, więc robimy go po kolei w wątku wywołującym
+            for cust_id, race_results in results_by_driver.items():
+                self.data_storage.save_iracing_results(cust_id, race_results)
+        return merged, errors
+
+class IRacingHistorySync:
+    # iRacing pozwala pytać o wyniki w oknach najwyżej 90-dniowych
+    window = timedelta(days=90)
+    # Wyniki wyścigów pojawiają się z opóźnieniem, więc każde okno zaczyna się chwilę przed poprzednim końcem
+    overlap = timedelta(hours=6)
+    history_start = datetime(2008, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, fetcher, data_storage):
+        self.fetcher = fetcher
+        self.data_storage = data_storage
+
+    def sync(self, cust_id, cancelled=None):
+        synced_through = self.data_storage.get_sync_state(cust_id)
+        window_begin = self.history_start if synced_through is None else synced_through - self.overlap
+        now = datetime.now(timezone.utc)
+        new_races = 0
+        while window_begin < now:
+            # Anulowana synchronizacja kończy się po bieżącym oknie - następna zacznie od zapisanego stanu
+            if cancelled is not None and cancelled.is_set():
+                break
+            window_end = min(window_begin + self.window, now)
+            race_results = self.fetcher.member_race_results(cust_id, window_begin, window_end)
+            new_races += self.data_storage.save_iracing_results(cust_id, race_results)
+            # Stan zapisujemy po każdym oknie, więc przerwana synchronizacja wznowi się od tego miejsca
+            self.data_storage.set_sync_state(cust_id, window_end)
+            window_begin = window_end
+        return new_races
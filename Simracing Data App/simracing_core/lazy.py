@@ -0,0 +1,13 @@
+import importlib
+
+
+class LazyModule:
+    # Pandas, numpy, pytz, keyring i iracingdataapi ładują się razem ponad sekundę, a pierwszy ekran to dwa przyciski -
+    # moduł importujemy dopiero przy pierwszym użyciu, potem atrybuty są zwykłymi polami obiektu
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attribute):
+        value = getattr(importlib.import_module(self.name), attribute)
+        setattr(self, attribute, value)
+        return value
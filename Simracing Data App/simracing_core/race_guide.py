@@ -0,0 +1,145 @@
+from datetime import datetime
+
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+pytz = LazyModule("pytz")
+
+
+class TimeConverter:
+    default_zone_name = "Europe/Warsaw"
+    display_format = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, zone_name=None):
+        # Strefa jest rozwiązywana raz, a nie przy każdej sesji
+        self.zone_name = zone_name or self.default_zone_name
+        self.zone = pytz.timezone(self.zone_name)
+
+    def parse(self, time_str):
+        # fromisoformat jest napisane w C i rozumie końcówkę "Z" z API iRacing
+        return datetime.fromisoformat(time_str)
+
+    def to_local(self, time_str):
+        return self.parse(time_str).astimezone(self.zone)
+
+    def format_local(self, time_str):
+        return self.to_local(time_str).strftime(self.display_format)
+
+    def now_local(self):
+        return datetime.now(self.zone)
+
+    def parse_utc_batch(self, time_strings):
+        # Cała kolumna czasów naraz: parsowanie w NumPy, bez obiektów datetime na wiersz
+        if all(time_str.endswith("Z") for time_str in time_strings):
+            return pd.DatetimeIndex(np.array([time_str[:-1] for time_str in time_strings], dtype="datetime64[s]"),
+                                    tz="UTC")
+        return pd.to_datetime(time_strings, utc=True, format="ISO8601")
+
+    def epoch_seconds(self, utc_times):
+        return utc_times.tz_localize(None).to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+    def format_local_batch(self, time_strings):
+        if len(time_strings) == 0:
+            return []
+        utc_times = time_strings if isinstance(time_strings, pd.DatetimeIndex) else self.parse_utc_batch(time_strings)
+        local_times = utc_times.tz_convert(self.zone_name).tz_localize(None).to_numpy(dtype="datetime64[s]")
+        return [time_str.replace("T", " ") for time_str in np.datetime_as_string(local_times, unit="s").tolist()]
+
+class RaceGuideIndex:
+    def __init__(self, sessions, time_converter):
+        start_times = time_converter.parse_utc_batch([race_info['start_time'] for race_info in sessions])
+        end_times = time_converter.parse_utc_batch([race_info['end_time'] for race_info in sessions])
+        start_seconds = time_converter.epoch_seconds(start_times)
+        end_seconds = time_converter.epoch_seconds(end_times)
+        # Sesje posortowane po czasie startu - każde zapytanie o okno czasu to dwa wyszukiwania binarne
+        order = np.argsort(start_seconds, kind="stable")
+        self.sessions = [sessions[position] for position in order]
+        self.starts = start_seconds[order]
+        self.ends = end_seconds[order]
+        # Końce sesji posortowane osobno - następny koniec po danej chwili to jedno wyszukiwanie binarne
+        self.sorted_ends = np.sort(end_seconds)
+        self.start_local = time_converter.format_local_batch(start_times[order])
+        self.end_local = time_converter.format_local_batch(end_times[order])
+        # Dla każdej serii pozycje jej sesji (rosnąco po starcie) i odpowiadające im czasy startu
+        positions_by_series = {}
+        for position, race_info in enumerate(self.sessions):
+            positions_by_series.setdefault(race_info['series_id'], []).append(position)
+        self.series_positions = {
+            series_id: np.array(positions, dtype=np.int64) for series_id, positions in positions_by_series.items()
+        }
+        self.series_starts = {
+            series_id: self.starts[positions] for series_id, positions in self.series_positions.items()
+        }
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def records(self, positions):
+        return [(self.sessions[position], self.start_local[position], self.end_local[position])
+                for position in positions]
+
+    def all_positions(self):
+        return np.arange(len(self.sessions))
+
+    def window(self, begin, end, series_ids=None):
+        # Sesje zaczynające się w [begin, end), czasy w sekundach od epoki
+        if series_ids is None:
+            return np.arange(np.searchsorted(self.starts, begin, side="left"),
+                             np.searchsorted(self.starts, end, side="left"))
+        parts = []
+        for series_id in series_ids:
+            starts = self.series_starts.get(series_id)
+            if starts is None:
+                continue
+            begin_index = np.searchsorted(starts, begin, side="left")
+            end_index = np.searchsorted(starts, end, side="left")
+            parts.append(self.series_positions[series_id][begin_index:end_index])
+        return np.sort(np.concatenate(parts)) if parts else np.arange(0)
+
+    def for_series(self, series_ids):
+        parts = [self.series_positions[series_id] for series_id in series_ids if series_id in self.series_positions]
+        return np.sort(np.concatenate(parts)) if parts else np.arange(0)
+
+    def starting_within(self, now, minutes, series_ids=None):
+        return self.window(now, now + minutes * 60, series_ids)
+
+    def fitting_between(self, begin, end, series_ids=None):
+        positions = self.window(begin, end, series_ids)
+        return positions[self.ends[positions] <= end]
+
+    def next_window_change(self, now, seconds):
+        # Najbliższa chwila, w której zmieni się lista sesji w oknie [now, now + seconds): któraś sesja wystartuje,
+        # wejdzie w okno albo (dla fitting_between) zmieści się w nim końcem. Filtr serii pomijamy - w najgorszym
+        # razie lista zostanie przeliczona bez zmian
+        times = []
+        started = np.searchsorted(self.starts, now, side="right")
+        if started < len(self.starts):
+            times.append(self.starts[started])
+        entering = np.searchsorted(self.starts, now + seconds, side="left")
+        if entering < len(self.starts):
+            times.append(self.starts[entering] - seconds)
+        ending = np.searchsorted(self.sorted_ends, now + seconds, side="right")
+        if ending < len(self.sorted_ends):
+            times.append(self.sorted_ends[ending] - seconds)
+        return float(min(times)) if times else None
+
+    def next_session(self, now, series_ids=None):
+        if series_ids is None:
+            position = int(np.searchsorted(self.starts, now, side="left"))
+            return position if position < len(self.sessions) else None
+        # Pierwsza przyszła sesja każdej serii; pozycje rosną razem z czasem startu, więc wygrywa najmniejsza
+        candidates = []
+        for series_id in series_ids:
+            starts = self.series_starts.get(series_id)
+            if starts is None:
+                continue
+            index = int(np.searchsorted(starts, now, side="left"))
+            if index < len(starts):
+                candidates.append(int(self.series_positions[series_id][index]))
+        return min(candidates) if candidates else None
+
+    def series_ids_matching(self, text, series_catalog):
+        text = text.casefold()
+        return [series_id for series_id in self.series_positions
+                if text in series_catalog.lookup(series_id).casefold()]
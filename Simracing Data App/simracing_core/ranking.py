@@ -0,0 +1,210 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+class WorldRanking:
+    # Plik z rankingiem leży obok main.py, a nie w pakiecie
+    default_csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Road_driver_stats.csv")
+    numeric_columns = {"IRATING": "float32", "AVG_INC": "float32", "AVG_FINISH_POS": "float32"}
+    cache_arrays = ("irating", "avg_inc", "avg_finish_pos", "name_offsets", "name_bytes", "lower_offsets",
+                    "lower_bytes", "name_order", "name_rank", "order_avg_inc", "order_avg_finish_pos")
+    cache_version = 2
+
+    def __init__(self, csv_path=None, cache_dir=None):
+        self.csv_path = csv_path or self.default_csv_path
+        self.cache_dir = cache_dir or os.path.splitext(self.csv_path)[0] + ".cache"
+        self.lock = threading.Lock()
+        self.loaded_signature = None
+        self.columns = {}
+
+    def source_signature(self):
+        stat = os.stat(self.csv_path)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "version": self.cache_version}
+
+    def cache_file(self, name):
+        return os.path.join(self.cache_dir, f"{name}.npy")
+
+    def cache_is_valid(self, signature):
+        try:
+            with open(os.path.join(self.cache_dir, "meta.json")) as meta_file:
+                return json.load(meta_file) == signature
+        except (OSError, ValueError):
+            return False
+
+    def build_cache(self, signature):
+        df = pd.read_csv(self.csv_path, usecols=["DRIVER", *self.numeric_columns],
+                         dtype={"DRIVER": str, **self.numeric_columns}, keep_default_na=False,
+                         na_values={column: [""] for column in self.numeric_columns})
+        irating = df["IRATING"].fillna(0).to_numpy(dtype=np.float32)
+        # Kolejność od najwyższego iRatingu; stabilne sortowanie zachowuje kolejność z pliku przy remisach
+        order = np.argsort(-irating, kind="stable")
+        # Nazwy jako jeden blok UTF-8 z przesunięciami - da się go mapować z dysku i dekodować tylko potrzebne wiersze
+        names = df["DRIVER"].to_numpy()[order]
+        name_offsets, name_bytes = self.pack_strings(names)
+        lower_names = [name.casefold() for name in names]
+        lower_offsets, lower_bytes = self.pack_strings(lower_names)
+        # Indeks nazw: miejsca w rankingu posortowane alfabetycznie, plus odwrotna permutacja do sortowania wyników
+        name_order = np.array(sorted(range(len(lower_names)), key=lower_names.__getitem__), dtype=np.int32)
+        name_rank = np.empty_like(name_order)
+        name_rank[name_order] = np.arange(len(name_order), dtype=np.int32)
+        avg_inc = df["AVG_INC"].to_numpy(dtype=np.float32)[order]
+        avg_finish_pos = df["AVG_FINISH_POS"].to_numpy(dtype=np.float32)[order]
+        arrays = {
+            "irating": irating[order],
+            "avg_inc": avg_inc,
+            "avg_finish_pos": avg_finish_pos,
+            "name_offsets": name_offsets,
+            "name_bytes": name_bytes,
+            "lower_offsets": lower_offsets,
+            "lower_bytes": lower_bytes,
+            "name_order": name_order,
+            "name_rank": name_rank,
+            "order_avg_inc": np.argsort(avg_inc, kind="stable").astype(np.int32),
+            "order_avg_finish_pos": np.argsort(avg_finish_pos, kind="stable").astype(np.int32),
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for name, array in arrays.items():
+            temp_path = self.cache_file(name) + ".tmp"
+            with open(temp_path, "wb") as array_file:
+                np.save(array_file, array)
+            os.replace(temp_path, self.cache_file(name))
+        # meta.json zapisujemy na końcu - przerwana budowa zostawia nieważny cache
+        with open(os.path.join(self.cache_dir, "meta.json"), "w") as meta_file:
+            json.dump(signature, meta_file)
+
+    def pack_strings(self, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    def load(self):
+        signature = self.source_signature()
+        with self.lock:
+            if signature == self.loaded_signature:
+                return self
+            if not self.cache_is_valid(signature):
+                self.build_cache(signature)
+            self.columns = {name: np.load(self.cache_file(name), mmap_mode="r") for name in self.cache_arrays}
+            self.loaded_signature = signature
+        return self
+
+    def __len__(self):
+        return len(self.columns.get("irating", ()))
+
+    def driver_name(self, rank_index):
+        offsets = self.columns["name_offsets"]
+        return self.columns["name_bytes"][offsets[rank_index]:offsets[rank_index + 1]].tobytes().decode("utf-8")
+
+    def lower_name(self, rank_index):
+        offsets = self.columns["lower_offsets"]
+        return self.columns["lower_bytes"][offsets[rank_index]:offsets[rank_index + 1]].tobytes().decode("utf-8")
+
+    def rows(self, rank_indexes):
+        return [
+            {
+                "rank": int(index) + 1,
+                "driver": self.driver_name(index),
+                "irating": int(self.columns["irating"][index]),
+                "avg_inc": float(self.columns["avg_inc"][index]),
+                "avg_finish_pos": float(self.columns["avg_finish_pos"][index]),
+            } for index in rank_indexes
+        ]
+
+    def top(self, n=30):
+        self.load()
+        return self.rows(range(min(n, len(self))))
+
+    def rank_of(self, irating):
+        # Tablica jest posortowana malejąco, więc szukamy w odwróconym widoku (rosnąco)
+        self.load()
+        ascending = self.columns["irating"][::-1]
+        return len(self) - int(np.searchsorted(ascending, irating, side="right")) + 1
+
+    def percentile_of(self, irating):
+        self.load()
+        if not len(self):
+            return 0.0
+        ascending = self.columns["irating"][::-1]
+        return 100.0 * int(np.searchsorted(ascending, irating, side="left")) / len(self)
+
+    def irating_bounds(self, min_irating=None, max_irating=None):
+        # Zakres miejsc w rankingu [początek, koniec) dla kierowców z iRatingiem w podanym przedziale
+        ascending = self.columns["irating"][::-1]
+        begin = 0 if max_irating is None else len(self) - int(np.searchsorted(ascending, max_irating, side="right"))
+        end = len(self) if min_irating is None else len(self) - int(np.searchsorted(ascending, min_irating, side="left"))
+        return begin, max(begin, end)
+
+    def search_names(self, text, substring=False):
+        # Zwraca miejsca w rankingu (rosnąco) kierowców, których nazwa zaczyna się od tekstu lub go zawiera
+        text = text.casefold()
+        if not substring:
+            name_order = self.columns["name_order"]
+            begin = bisect_left(name_order, text, key=self.lower_name)
+            end = bisect_left(name_order, text + "\U0010ffff", lo=begin, key=self.lower_name)
+            return np.sort(name_order[begin:end])
+        needle = text.encode("utf-8")
+        pattern = re.compile(re.escape(needle))
+        offsets = self.columns["lower_offsets"]
+        # memoryview zamiast tobytes() - przeszukujemy zmapowany blok nazw bez kopiowania go przy każdym znaku
+        names = memoryview(self.columns["lower_bytes"])
+        starts = np.fromiter((match.start() for match in pattern.finditer(names)), dtype=np.int64)
+        rank_indexes = np.searchsorted(offsets, starts, side="right") - 1
+        # Odrzucamy trafienia na styku dwóch sąsiednich nazw
+        inside = starts + len(needle) <= offsets[rank_indexes + 1]
+        crossed = []
+        # finditer nie zwraca nakładających się trafień, więc odrzucone trafienie mogło zasłonić prawdziwe,
+        # które zaczyna się w jego środku - tylko tam szukamy jeszcze raz. Takich miejsc jest niewiele, a
+        # lookahead w całym wzorcu spowolniłby każde wyszukiwanie kilkukrotnie
+        pending = starts[~inside].tolist()
+        while pending:
+            start = pending.pop()
+            match = pattern.search(names, start + 1, start + 2 * len(needle) - 1)
+            if match is None:
+                continue
+            rank_index = int(np.searchsorted(offsets, match.start(), side="right")) - 1
+            if match.end() <= offsets[rank_index + 1]:
+                crossed.append(rank_index)
+            else:
+                pending.append(match.start())
+        return np.unique(np.concatenate([rank_indexes[inside], np.array(crossed, dtype=np.int64)]))
+
+    def select(self, search="", substring=False, min_irating=None, max_irating=None, sort_by="IRATING",
+               descending=True):
+        # Wynik to sekwencja miejsc w rankingu w kolejności wyświetlania - range lub tablica, nigdy gotowe wiersze
+        self.load()
+        begin, end = self.irating_bounds(min_irating, max_irating)
+        candidates = None
+        if search:
+            candidates = self.search_names(search, substring)
+            candidates = candidates[(candidates >= begin) & (candidates < end)]
+        if sort_by == "IRATING":
+            if candidates is None:
+                return range(begin, end) if descending else range(end - 1, begin - 1, -1)
+            return candidates if descending else candidates[::-1]
+        if sort_by == "DRIVER":
+            order, sort_key = self.columns["name_order"], self.columns["name_rank"]
+        else:
+            column = {"AVG_INC": "avg_inc", "AVG_FINISH_POS": "avg_finish_pos"}[sort_by]
+            order, sort_key = self.columns[f"order_{column}"], self.columns[column]
+        if candidates is None:
+            selection = order if (begin, end) == (0, len(self)) else order[(order >= begin) & (order < end)]
+        else:
+            selection = candidates[np.argsort(sort_key[candidates], kind="stable")]
+        return selection[::-1] if descending else selection
+
+    def irating_at_percentile(self, percentile):
+        # Dane są już posortowane, więc percentyl to zwykły odczyt z tablicy
+        self.load()
+        if not len(self):
+            return 0.0
+        ascending_index = round(percentile / 100 * (len(self) - 1))
+        return float(self.columns["irating"][len(self) - 1 - ascending_index])
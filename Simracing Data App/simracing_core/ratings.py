@@ -0,0 +1,67 @@
+from .lazy import LazyModule
+
+np = LazyModule("numpy")
+
+
+class RatingState:
+    __slots__ = ("skill", "safety", "races_count")
+
+    def __init__(self, skill, safety, races_count=0):
+        self.skill = skill
+        self.safety = safety
+        self.races_count = races_count
+
+class RatingEngine:
+    initial_skill = 1500.0
+    initial_safety = 5.0
+    # Obie oceny to średnie wykładnicze, więc nowy wyścig zmienia stan w O(1), a pełne przeliczenie da się zwektoryzować
+    skill_weight = 0.1
+    safety_weight = 0.1
+    # Zwycięstwo jest warte tyle punktów ponad średnią stawki, a ostatnie miejsce w typowej stawce - tyle poniżej
+    performance_spread = 400.0
+    reference_field_size = 20
+    # Każdy incydent obniża ocenę bezpieczeństwa wyścigu o 20%, wyścig bez incydentów daje 10
+    incident_factor = 0.8
+
+    def initial_state(self):
+        return RatingState(self.initial_skill, self.initial_safety)
+
+    def race_performance(self, field_strength, position):
+        # Działa dla pojedynczych liczb i dla tablic numpy (np.clip tylko w przeliczeniu całej historii)
+        placement = 1.0 - 2.0 * (position - 1) / (self.reference_field_size - 1)
+        if isinstance(placement, float):
+            return field_strength + self.performance_spread * min(max(placement, -1.0), 1.0)
+        return field_strength + self.performance_spread * np.clip(placement, -1.0, 1.0)
+
+    def race_safety(self, incidents_count):
+        return 10.0 * self.incident_factor ** incidents_count
+
+    def update(self, state, field_strength, position, incidents_count):
+        position = max(position or 1, 1)
+        incidents_count = max(incidents_count or 0, 0)
+        skill = state.skill
+        # Bez średniego poziomu stawki nie wiadomo, ile wart był wynik - zmienia się tylko ocena bezpieczeństwa
+        if field_strength is not None and field_strength > 0:
+            skill += self.skill_weight * (self.race_performance(field_strength, position) - skill)
+        safety = state.safety + self.safety_weight * (self.race_safety(incidents_count) - state.safety)
+        return RatingState(skill, safety, state.races_count + 1)
+
+    def recompute(self, field_strengths, positions, incidents_counts, state=None):
+        # Wejście w kolejności rozegrania wyścigów, od najstarszego. Podając stan po poprzednim fragmencie
+        # można przeliczać historię kawałkami - wynik jest ten sam, co dla całej tablicy naraz
+        state = state or self.initial_state()
+        field_strengths = np.nan_to_num(np.asarray(field_strengths, dtype=np.float64))
+        positions = np.maximum(np.nan_to_num(np.asarray(positions, dtype=np.float64), nan=1.0), 1.0)
+        incidents_counts = np.maximum(np.nan_to_num(np.asarray(incidents_counts, dtype=np.float64)), 0.0)
+        rated = field_strengths > 0
+        skill = self.exponential_average(self.race_performance(field_strengths[rated], positions[rated]),
+                                         state.skill, self.skill_weight)
+        safety = self.exponential_average(self.race_safety(incidents_counts), state.safety, self.safety_weight)
+        return RatingState(skill, safety, state.races_count + len(positions))
+
+    @staticmethod
+    def exponential_average(values, initial, weight):
+        # s_n = (1-w)^n * s_0 + sum_k w * (1-w)^(n-k) * x_k - to samo co n kroków update, jednym iloczynem skalarnym
+        count = len(values)
+        decay = (1.0 - weight) ** np.arange(count - 1, -1, -1, dtype=np.float64)
+        return float((1.0 - weight) ** count * initial + weight * decay @ values)
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def intern_text(value):
+    # Wartości z bazy i API bywają NULL/None, a sys.intern przyjmuje tylko str
+    return sys.intern(value) if isinstance(value, str) else value
+
+# Górna granica średniego poziomu wyścigu - taka sama w formularzu i w imporcie
+max_field_strength = 20000
+
+
+def validate_result(track_name, car_model, position_in_race, incidents_count=0, field_strength=0):
+    # Te same zasady obowiązują w formularzu dodawania wyniku i w imporcie z pliku
+    if not track_name or not car_model:
+        return "Wprowadź wszystkie wymagane informacje."
+    if position_in_race < 1:
+        return "Pozycja w wyścigu musi wynosić co najmniej 1."
+    if incidents_count < 0:
+        return "Ilość incydentów nie może być ujemna."
+    if not 0 <= field_strength <= max_field_strength:
+        return f"Średni poziom wyścigu musi mieścić się w zakresie 0-{max_field_strength}."
+    return None
+
+class RaceResult:
+    # Bez __dict__ na każdy wyścig - przy pełnej historii to kilkukrotnie mniej pamięci
+    __slots__ = ("id", "created_at", "game", "car_model", "incidents_count", "position_in_race", "track_name",
+                 "field_strength")
+
+    def __init__(self, *args, **kwargs):
+        self.id = kwargs.get("id")
+        self.created_at = kwargs.get("created_at")
+        self.game = intern_text(kwargs.get("game", "Project Cars 2"))
+        self.car_model = intern_text(kwargs.get("car_model", ""))
+        self.incidents_count = kwargs.get("incidents_count", 0)
+        self.position_in_race = kwargs.get("position_in_race", 0)
+        self.track_name = intern_text(kwargs.get("track_name", ""))
+        # Średni poziom umiejętności rywali; 0 oznacza wynik dodany zanim aplikacja o niego pytała
+        self.field_strength = kwargs.get("field_strength", 0)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Wiersze w kolejności __slots__; nazwy gier, aut i torów powtarzają się, więc trzymamy je raz
+        new = cls.__new__
+        results = []
+        for row in rows:
+            result = new(cls)
+            (result.id, result.created_at, game, car_model, result.incidents_count, result.position_in_race,
+             track_name, result.field_strength) = row
+            result.game = intern_text(game)
+            result.car_model = intern_text(car_model)
+            result.track_name = intern_text(track_name)
+            results.append(result)
+        return results
+
+class Catalog:
+    catalogs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogs")
+    max_age = 7 * 24 * 3600
+    # Po nieudanym odświeżeniu nie pytamy API o brakujące id częściej niż raz na godzinę
+    retry_interval = 3600
+
+    def __init__(self, name, endpoint, id_key, name_key, unknown_name):
+        self.name = name
+        self.endpoint = endpoint
+        self.id_key = id_key
+        self.name_key = name_key
+        self.unknown_name = unknown_name
+        self.bundled_path = os.path.join(self.catalogs_dir, name + ".json")
+        self.downloaded_path = os.path.join(self.catalogs_dir, name + ".downloaded.json")
+        # Plik wczytujemy dopiero przy pierwszym wyszukaniu, więc start aplikacji nic nie kosztuje
+        self.names = None
+        self.memo = {}
+        self.missing_ids = set()
+        self.last_refresh_attempt = 0.0
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.names is not None:
+                return
+            path = self.downloaded_path if os.path.exists(self.downloaded_path) else self.bundled_path
+            try:
+                with open(path, encoding="utf-8") as catalog_file:
+                    self.names = {int(item_id): name for item_id, name in json.load(catalog_file).items()}
+            except (OSError, ValueError) as e:
+                logger.warning("Nie udało się wczytać katalogu %s: %s", path, e)
+                self.names = {}
+
+    def lookup(self, item_id):
+        try:
+            return self.memo[item_id]
+        except KeyError:
+            pass
+        if self.names is None:
+            self.load()
+        name = self.names.get(item_id)
+        if name is None:
+            self.missing_ids.add(item_id)
+            name = self.unknown_name
+        self.memo[item_id] = name
+        return name
+
+    def needs_refresh(self):
+        if time.time() - self.last_refresh_attempt < self.retry_interval:
+            return False
+        if self.missing_ids:
+            return True
+        try:
+            return time.time() - os.path.getmtime(self.downloaded_path) > self.max_age
+        except OSError:
+            return True
+
+    def refresh(self, session):
+        self.last_refresh_attempt = time.time()
+        items = session.call(self.endpoint)
+        names = {item[self.id_key]: item[self.name_key] for item in items
+                 if item.get(self.id_key) is not None and item.get(self.name_key)}
+        if not names:
+            return False
+        os.makedirs(self.catalogs_dir, exist_ok=True)
+        temporary_path = self.downloaded_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as catalog_file:
+            json.dump({str(item_id): name for item_id, name in sorted(names.items())}, catalog_file,
+                      ensure_ascii=False, indent=1)
+        os.replace(temporary_path, self.downloaded_path)
+        with self.lock:
+            self.names = names
+            self.memo = {}
+            self.missing_ids = set()
+        return True
+
+class IRacingRaceResult:
+    car_catalog = Catalog("cars", "get_cars", "car_id", "car_name", "Unknown")
+    # Kolejność jak w DataStorage.iracing_columns (cust_id na końcu, poza nimi) - from_rows rozpakowuje
+    # wiersze bez słowników
+    __slots__ = ("subsession_id", "series_id", "series_name", "start_time", "end_time", "track_name", "car_id",
+                 "start_position", "finish_position", "incidents_count", "points", "strength_of_field",
+                 "oldi_rating", "newi_rating", "laps_led", "cust_id")
+
+    def __init__(self, race_data, cust_id=None):
+        # Kierowca nie jest częścią wyniku w API - podajemy go, gdy wyniki wielu kierowców trafiają do jednej tabeli
+        self.cust_id = cust_id
+        # member_recent_races i results/search_series nazywają część pól inaczej
+        self.subsession_id = race_data.get('subsession_id')
+        self.series_id = race_data.get('series_id')
+        self.series_name = intern_text(race_data.get('series_name', ''))
+        self.start_time = race_data.get('start_time', race_data.get('session_start_time', ''))
+        self.end_time = race_data.get('end_time', '')
+        self.start_position = race_data.get('start_position', race_data.get('starting_position', 0))
+        self.finish_position = race_data.get('finish_position', 0)
+        self.track_name = intern_text(race_data.get('track', {}).get('track_name', ''))
+        self.incidents_count = race_data.get('incidents', 0)
+        self.points = race_data.get('points', race_data.get('champ_points', 0))
+        self.strength_of_field = race_data.get('strength_of_field', race_data.get('event_strength_of_field', 0))
+        self.oldi_rating = race_data.get('oldi_rating', '')
+        self.newi_rating = race_data.get('newi_rating', '')
+        self.laps_led = race_data.get('laps_led', 0)
+        self.car_id = race_data.get('car_id', 0)
+
+    @property
+    def car_name(self):
+        return IRacingRaceResult.car_catalog.lookup(self.car_id)
+
+    @classmethod
+    def from_payloads(cls, races, cust_id=None):
+        return [cls(race_data, cust_id) for race_data in races]
+
+    @classmethod
+    def from_rows(cls, rows, cust_id=None):
+        new = cls.__new__
+        results = []
+        for row in rows:
+            result = new(cls)
+            result.cust_id = cust_id
+            (result.subsession_id, result.series_id, series_name, result.start_time, result.end_time, track_name,
+             result.car_id, result.start_position, result.finish_position, result.incidents_count, result.points,
+             result.strength_of_field, result.oldi_rating, result.newi_rating, result.laps_led) = row
+            result.series_name = intern_text(series_name)
+            result.track_name = intern_text(track_name)
+            results.append(result)
+        return results
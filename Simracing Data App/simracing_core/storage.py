@@ -0,0 +1,547 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .lazy import LazyModule
+from .ratings import RatingEngine, RatingState
+from .records import IRacingRaceResult, RaceResult
+from .summaries import ResultSummary
+
+np = LazyModule("numpy")
+
+
+class ConnectionPool:
+    def __init__(self, database, max_connections=4):
+        self.database = database
+        self.max_connections = max_connections
+        self.idle_connections = queue.LifoQueue()
+        self.created_connections = 0
+        self.lock = threading.Lock()
+
+    def create_connection(self):
+        # Zapytania mają stały tekst, więc sqlite3 trzyma je w cache przygotowanych instrukcji połączenia
+        conn = sqlite3.connect(self.database, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle_connections.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created_connections < self.max_connections:
+                self.created_connections += 1
+                return self.create_connection()
+        return self.idle_connections.get()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self.idle_connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self.lock:
+            while True:
+                try:
+                    conn = self.idle_connections.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self.created_connections -= 1
+
+class DataStorage:
+    schema_version = 7
+    iracing_columns = ("subsession_id", "series_id", "series_name", "start_time", "end_time", "track_name", "car_id",
+                       "start_position", "finish_position", "incidents_count", "points", "strength_of_field",
+                       "oldi_rating", "newi_rating", "laps_led")
+    summary_columns = ("car_model", "track_name")
+    # Kolumny, po których można sortować stronicowaną tabelę wyników - każda ma indeks (gra, kolumna)
+    results_sort_columns = ("car_model", "track_name", "incidents_count", "position_in_race")
+    summary_fields = ("races_count", "incidents_races", "incidents_sum", "incidents_min", "incidents_max",
+                      "positions_races", "position_sum", "position_min", "position_max", "recent")
+    shared_instance = None
+
+    def __init__(self, database="data.db"):
+        self.car_model = None
+        self.incidents_count = None
+        self.position_in_race = None
+        self.track_name = None
+        self.results_history = []
+        self.max_results_history = 15
+        self.pool = ConnectionPool(database)
+        # Licznik zmian - okna czytają bazę ponownie tylko wtedy, gdy coś zostało zapisane
+        self.generation = 0
+        self.loaded_generation = None
+        # Gotowe statystyki z result_stats - ważne tylko dla pokolenia, w którym je przeczytano
+        self.aggregate_cache = {}
+        self.aggregate_cache_generation = 0
+        # Liczba wyników i pierwsza strona tabeli bez wyszukiwania - ponowne otwarcie okna nie pyta wtedy bazy
+        self.results_cache = {}
+        self.results_cache_generation = 0
+        self.rating_engine = RatingEngine()
+        self.rating_states = {}
+        self.create_table()
+
+    @classmethod
+    def shared(cls):
+        if cls.shared_instance is None:
+            cls.shared_instance = cls()
+        return cls.shared_instance
+
+    def create_table(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if version < 1:
+                self.migrate_schema_v1(cursor)
+            if version < 2:
+                self.migrate_schema_v2(cursor)
+            if version < 3:
+                self.migrate_schema_v3(cursor)
+            if version < 4:
+                self.migrate_schema_v4(cursor)
+            if version < 5:
+                self.migrate_schema_v5(cursor)
+            if version < 6:
+                self.migrate_schema_v6(cursor)
+            if version < 7:
+                self.migrate_schema_v7(cursor)
+            cursor.execute(f'PRAGMA user_version = {self.schema_version}')
+            conn.commit()
+
+    def migrate_schema_v1(self, cursor):
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(results)')]
+        if columns and "id" not in columns:
+            # Starsza wersja tabeli nie miała klucza - przenosimy dane, najstarsze wyniki dostają najniższe id
+            cursor.execute('ALTER TABLE results RENAME TO results_legacy')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                car_model TEXT,
+                incidents_count INTEGER,
+                position_in_race INTEGER,
+                track_name TEXT
+            )
+        ''')
+        if columns and "id" not in columns:
+            cursor.execute('''
+                INSERT INTO results (car_model, incidents_count, position_in_race, track_name)
+                SELECT car_model, incidents_count, position_in_race, track_name
+                FROM results_legacy ORDER BY rowid DESC
+            ''')
+            cursor.execute('DROP TABLE results_legacy')
+
+    def migrate_schema_v2(self, cursor):
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(results)')]
+        if "game" not in columns:
+            # Do tej pory wyniki można było dodawać tylko dla Project Cars 2
+            cursor.execute("ALTER TABLE results ADD COLUMN game TEXT NOT NULL DEFAULT 'Project Cars 2'")
+        # Indeksy zawierają kolumny liczbowe, więc agregaty liczą się z samego indeksu, bez czytania tabeli
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_results_game_car
+            ON results (game, car_model, incidents_count, position_in_race)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_results_game_track
+            ON results (game, track_name, incidents_count, position_in_race)
+        ''')
+
+    def migrate_schema_v3(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS iracing_results (
+                cust_id INTEGER NOT NULL,
+                subsession_id INTEGER NOT NULL,
+                series_id INTEGER,
+                series_name TEXT,
+                start_time TEXT,
+                end_time TEXT,
+                track_name TEXT,
+                car_id INTEGER,
+                start_position INTEGER,
+                finish_position INTEGER,
+                incidents_count INTEGER,
+                points INTEGER,
+                strength_of_field INTEGER,
+                oldi_rating INTEGER,
+                newi_rating INTEGER,
+                laps_led INTEGER,
+                PRIMARY KEY (cust_id, subsession_id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_iracing_results_cust_start
+            ON iracing_results (cust_id, start_time)
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS iracing_sync_state (
+                cust_id INTEGER PRIMARY KEY,
+                synced_through TEXT NOT NULL
+            )
+        ''')
+
+    def migrate_schema_v4(self, cursor):
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(results)')]
+        if "field_strength" not in columns:
+            cursor.execute('ALTER TABLE results ADD COLUMN field_strength INTEGER NOT NULL DEFAULT 0')
+        # Bieżący stan ocen - nowy wyścig aktualizuje go w O(1), bez ponownego czytania historii
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ratings (
+                subject TEXT PRIMARY KEY,
+                skill REAL NOT NULL,
+                safety REAL NOT NULL,
+                races_count INTEGER NOT NULL
+            )
+        ''')
+        self.recompute_all_ratings(cursor)
+
+    def migrate_schema_v5(self, cursor):
+        # Import sprawdza duplikaty po dacie wyścigu, a oceny liczą się w kolejności dat
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_results_game_created ON results (game, created_at)')
+
+    def migrate_schema_v6(self, cursor):
+        # Podsumowania aut i torów zmieniają się razem z zapisem wyników - statystyki nie czytają tabeli results.
+        # Bez klucza głównego, bo starsze wiersze mogą mieć NULL zamiast nazwy auta lub toru
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS result_stats (
+                game TEXT NOT NULL,
+                group_column TEXT NOT NULL,
+                group_value TEXT,
+                races_count INTEGER NOT NULL,
+                incidents_races INTEGER NOT NULL,
+                incidents_sum INTEGER NOT NULL,
+                incidents_min INTEGER,
+                incidents_max INTEGER,
+                positions_races INTEGER NOT NULL,
+                position_sum INTEGER NOT NULL,
+                position_min INTEGER,
+                position_max INTEGER,
+                recent TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_result_stats_group ON result_stats (game, group_column, group_value)
+        ''')
+        for (game,) in cursor.execute('SELECT DISTINCT game FROM results').fetchall():
+            self.rebuild_result_stats(cursor, game)
+
+    def migrate_schema_v7(self, cursor):
+        # Tabela wyników sortuje się po każdej kolumnie w obrębie gry. Każdy wpis indeksu kończy się rowid,
+        # czyli id, więc indeks (gra, kolumna) daje od razu kolejność (kolumna, id) stronicowania po kluczu.
+        # Statystyki czytają już result_stats, więc indeksy (gra, auto/tor, incydenty, pozycja) z wersji 2
+        # zastępujemy węższymi - inaczej każdy zapis aktualizowałby dwa indeksy więcej
+        cursor.execute('DROP INDEX IF EXISTS idx_results_game_car')
+        cursor.execute('DROP INDEX IF EXISTS idx_results_game_track')
+        for column in self.results_sort_columns:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_results_game_{column} ON results (game, {column})')
+
+    def load_from_database(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, created_at, game, car_model, incidents_count, position_in_race, track_name, field_strength
+                FROM results ORDER BY id DESC LIMIT ?
+            ''', (self.max_results_history,)).fetchall()
+        self.loaded_generation = self.generation
+        self.results_history = RaceResult.from_rows(rows)
+
+    def refresh_history(self):
+        if self.loaded_generation != self.generation:
+            self.load_from_database()
+
+    def save_to_database(self):
+        # Zapisujemy tylko wyniki, które nie mają jeszcze id - reszta już jest w bazie
+        pending_results = [result for result in reversed(self.results_history) if result.id is None]
+        if pending_results:
+            self.insert_results(pending_results)
+
+    def insert_results(self, results):
+        # Wyniki od najstarszego; wszystkie trafiają do bazy w jednej transakcji razem z ocenami
+        rating_states = {}
+        summary_entries = {}
+        with self.pool.connection() as conn, conn:
+            cursor = conn.cursor()
+            for result in results:
+                if result.created_at is None:
+                    result.created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                cursor.execute('''
+                    INSERT INTO results (created_at, game, car_model, incidents_count, position_in_race, track_name,
+                                         field_strength)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (result.created_at, result.game, result.car_model, result.incidents_count,
+                      result.position_in_race, result.track_name, result.field_strength))
+                result.id = cursor.lastrowid
+                state = rating_states.get(result.game) or self.rating_states.get(result.game) \
+                    or self.read_rating(cursor, result.game)
+                rating_states[result.game] = self.rating_engine.update(state, result.field_strength,
+                                                                       result.position_in_race, result.incidents_count)
+                entry = (result.created_at, result.id, result.incidents_count, result.position_in_race)
+                for group_column in self.summary_columns:
+                    summary_entries.setdefault((result.game, group_column, getattr(result, group_column)),
+                                               []).append(entry)
+            for subject, state in rating_states.items():
+                self.write_rating(cursor, subject, state)
+            # Zmiany podsumowań zbieramy w pamięci - przy zapisie wielu wyników każde auto i tor zapisujemy raz
+            for key, entries in summary_entries.items():
+                self.merge_result_summary(cursor, key, ResultSummary.from_entries(entries))
+        # Pamięć podręczną ocen zmieniamy dopiero po udanym zatwierdzeniu transakcji
+        self.rating_states.update(rating_states)
+        self.mark_changed()
+
+    def game_rating(self, game="Project Cars 2"):
+        return self.rating(game)
+
+    def iracing_rating(self, cust_id):
+        return self.rating(f"iRacing:{cust_id}")
+
+    def rating_subjects(self):
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute('SELECT subject FROM ratings ORDER BY subject')]
+
+    def rating(self, subject):
+        state = self.rating_states.get(subject)
+        if state is None:
+            with self.pool.connection() as conn:
+                state = self.rating_states[subject] = self.read_rating(conn, subject)
+        return state
+
+    def read_rating(self, cursor, subject):
+        row = cursor.execute('SELECT skill, safety, races_count FROM ratings WHERE subject = ?', (subject,)).fetchone()
+        return self.rating_engine.initial_state() if row is None else RatingState(*row)
+
+    def write_rating(self, cursor, subject, state):
+        cursor.execute('''
+            INSERT OR REPLACE INTO ratings (subject, skill, safety, races_count) VALUES (?, ?, ?, ?)
+        ''', (subject, state.skill, state.safety, state.races_count))
+
+    def recompute_rating(self, cursor, subject, query, params, chunk_size=100000):
+        # Historia jest czytana fragmentami, więc pamięć nie rośnie z liczbą wyścigów
+        rows_cursor = cursor.connection.execute(query, params)
+        state = self.rating_engine.initial_state()
+        while rows := rows_cursor.fetchmany(chunk_size):
+            # NULL z bazy staje się NaN, a silnik ocen traktuje go jak brak danych
+            columns = np.array(rows, dtype=np.float64).reshape(-1, 3).T
+            state = self.rating_engine.recompute(*columns, state=state)
+        self.write_rating(cursor, subject, state)
+        return state
+
+    def recompute_game_rating(self, cursor, game):
+        return self.recompute_rating(cursor, game, '''
+            SELECT field_strength, position_in_race, incidents_count FROM results WHERE game = ?
+            ORDER BY created_at, id
+        ''', (game,))
+
+    def recompute_iracing_rating(self, cursor, cust_id):
+        return self.recompute_rating(cursor, f"iRacing:{cust_id}", '''
+            SELECT strength_of_field, finish_position, incidents_count FROM iracing_results
+            WHERE cust_id = ? ORDER BY start_time
+        ''', (cust_id,))
+
+    def recompute_all_ratings(self, cursor=None):
+        if cursor is None:
+            with self.pool.connection() as conn, conn:
+                return self.recompute_all_ratings(conn.cursor())
+        states = {}
+        for (game,) in cursor.execute('SELECT DISTINCT game FROM results').fetchall():
+            states[game] = self.recompute_game_rating(cursor, game)
+        for (cust_id,) in cursor.execute('SELECT DISTINCT cust_id FROM iracing_results').fetchall():
+            states[f"iRacing:{cust_id}"] = self.recompute_iracing_rating(cursor, cust_id)
+        self.rating_states = states
+        return states
+
+    def merge_result_summary(self, cursor, key, summary):
+        row = cursor.execute(f'''
+            SELECT {", ".join(self.summary_fields)} FROM result_stats
+            WHERE game = ? AND group_column = ? AND group_value IS ?
+        ''', key).fetchone()
+        if row is not None:
+            stored = ResultSummary.from_row(row)
+            stored.merge(summary)
+            summary = stored
+            cursor.execute('DELETE FROM result_stats WHERE game = ? AND group_column = ? AND group_value IS ?', key)
+        self.write_result_summaries(cursor, [(key, summary)])
+
+    def write_result_summaries(self, cursor, summaries):
+        cursor.executemany(f'''
+            INSERT INTO result_stats (game, group_column, group_value, {", ".join(self.summary_fields)})
+            VALUES ({", ".join("?" * (len(self.summary_fields) + 3))})
+        ''', (key + summary.row() for key, summary in summaries))
+
+    def rebuild_result_stats(self, cursor, game):
+        # Po imporcie i migracji liczymy podsumowania gry od nowa. Grupy idą w kolejności indeksów
+        # (gra, auto/tor), a okno ostatnich wyścigów z indeksu po dacie
+        cursor.execute('DELETE FROM result_stats WHERE game = ?', (game,))
+        summaries = {}
+        for group_column in self.summary_columns:
+            for row in cursor.execute(f'''
+                SELECT {group_column}, COUNT(*), COUNT(incidents_count), COALESCE(SUM(incidents_count), 0),
+                       MIN(incidents_count), MAX(incidents_count), COUNT(position_in_race),
+                       COALESCE(SUM(position_in_race), 0), MIN(position_in_race), MAX(position_in_race)
+                FROM results WHERE game = ? GROUP BY {group_column}
+            ''', (game,)):
+                summaries[(game, group_column, row[0])] = ResultSummary(*row[1:])
+            for row in cursor.execute(f'''
+                SELECT {group_column}, created_at, id, incidents_count, position_in_race FROM (
+                    SELECT {group_column}, created_at, id, incidents_count, position_in_race,
+                           ROW_NUMBER() OVER (PARTITION BY {group_column} ORDER BY created_at DESC, id DESC) AS recent_rank
+                    FROM results WHERE game = ?
+                ) WHERE recent_rank <= ?
+            ''', (game, ResultSummary.recent_size)):
+                summaries[(game, group_column, row[0])].recent.append(row[1:])
+        self.write_result_summaries(cursor, summaries.items())
+
+    def mark_changed(self):
+        self.generation += 1
+
+    def add_result_to_history(self, result):
+        self.refresh_history()
+        self.results_history.insert(0, result)
+        self.save_to_database()
+        self.results_history = self.results_history[:self.max_results_history]
+        self.loaded_generation = self.generation
+
+    def results_filter(self, game=None, search=""):
+        conditions = []
+        params = []
+        if game is not None:
+            conditions.append("game = ?")
+            params.append(game)
+        if search:
+            conditions.append("(car_model LIKE ? OR track_name LIKE ?)")
+            params.extend([f"%{search}%", f"%{search}%"])
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where_clause, params
+
+    def cached_results_query(self, cache_key, query):
+        # Zapamiętujemy tylko zapytania bez wyszukiwania - tekst zmienia się z każdym znakiem
+        if self.results_cache_generation != self.generation:
+            self.results_cache = {}
+            self.results_cache_generation = self.generation
+        if cache_key not in self.results_cache:
+            self.results_cache[cache_key] = query()
+        return self.results_cache[cache_key]
+
+    def count_results(self, game=None, search=""):
+        if not search:
+            return self.cached_results_query(("count", game), lambda: self.query_count_results(game))
+        return self.query_count_results(game, search)
+
+    def query_count_results(self, game=None, search=""):
+        where_clause, params = self.results_filter(game, search)
+        with self.pool.connection() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM results {where_clause}', params).fetchone()[0]
+
+    def fetch_results_page(self, after=None, limit=200, order_column="id", descending=True, game=None, search=""):
+        if after is None and not search:
+            return self.cached_results_query(
+                ("first_page", limit, order_column, descending, game),
+                lambda: self.query_results_page(None, limit, order_column, descending, game))
+        return self.query_results_page(after, limit, order_column, descending, game, search)
+
+    def query_results_page(self, after=None, limit=200, order_column="id", descending=True, game=None, search=""):
+        # Stronicowanie po kluczu (wartość kolumny, id) - każda strona kosztuje tyle samo, niezależnie od przewinięcia
+        where_clause, params = self.results_filter(game, search)
+        conditions = [where_clause[len("WHERE "):]] if where_clause else []
+        if after is not None:
+            last_value, last_id = after
+            operator = "<" if descending else ">"
+            if order_column == "id":
+                conditions.append(f"id {operator} ?")
+                params.append(last_id)
+            elif last_value is None:
+                # NULL jest w SQLite najmniejszą wartością: przy DESC trafia na koniec, przy ASC na początek
+                if descending:
+                    conditions.append(f"({order_column} IS NULL AND id < ?)")
+                else:
+                    conditions.append(f"({order_column} IS NOT NULL OR id > ?)")
+                params.append(last_id)
+            elif descending:
+                conditions.append(f"(({order_column}, id) < (?, ?) OR {order_column} IS NULL)")
+                params.extend([last_value, last_id])
+            else:
+                conditions.append(f"({order_column}, id) > (?, ?)")
+                params.extend([last_value, last_id])
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        order_clause = f"ORDER BY id {direction}" if order_column == "id" else \
+            f"ORDER BY {order_column} {direction}, id {direction}"
+        with self.pool.connection() as conn:
+            return conn.execute(f'''
+                SELECT id, created_at, game, car_model, incidents_count, position_in_race, track_name
+                FROM results {where_clause} {order_clause} LIMIT ?
+            ''', params + [limit]).fetchall()
+
+    def stats_by_car(self, game="Project Cars 2"):
+        return self.aggregate_results("car_model", game)
+
+    def stats_by_track(self, game="Project Cars 2"):
+        return self.aggregate_results("track_name", game)
+
+    def aggregate_results(self, group_column, game):
+        if group_column not in self.summary_columns:
+            raise ValueError(f"Statystyki są dostępne tylko według: {', '.join(self.summary_columns)}")
+        if self.aggregate_cache_generation != self.generation:
+            self.aggregate_cache = {}
+            self.aggregate_cache_generation = self.generation
+        cache_key = (group_column, game)
+        if cache_key in self.aggregate_cache:
+            return self.aggregate_cache[cache_key]
+        with self.pool.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT group_value, {", ".join(self.summary_fields)} FROM result_stats
+                WHERE game = ? AND group_column = ?
+                ORDER BY races_count DESC, group_value
+            ''', (game, group_column)).fetchall()
+        stats = [dict({group_column: row[0]}, **ResultSummary.from_row(row[1:]).stats()) for row in rows]
+        self.aggregate_cache[cache_key] = stats
+        return stats
+
+    def save_iracing_results(self, cust_id, race_results):
+        # Wyścig o tym samym subsession_id może przyjść w dwóch oknach synchronizacji - zapisujemy go raz
+        rows = [(cust_id,) + tuple(getattr(result, column) for column in self.iracing_columns)
+                for result in race_results]
+        with self.pool.connection() as conn, conn:
+            before = conn.total_changes
+            conn.executemany(f'''
+                INSERT OR IGNORE INTO iracing_results (cust_id, {", ".join(self.iracing_columns)})
+                VALUES ({", ".join("?" * (len(self.iracing_columns) + 1))})
+            ''', rows)
+            inserted = conn.total_changes - before
+            # Okna synchronizacji mogą dopisać starsze wyścigi między istniejące, więc ocenę liczymy od nowa
+            state = self.recompute_iracing_rating(conn.cursor(), cust_id) if inserted else None
+        if state is not None:
+            self.rating_states[f"iRacing:{cust_id}"] = state
+        return inserted
+
+    def load_iracing_results(self, cust_id, limit=None):
+        with self.pool.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {", ".join(self.iracing_columns)} FROM iracing_results
+                WHERE cust_id = ? ORDER BY start_time DESC LIMIT ?
+            ''', (cust_id, -1 if limit is None else limit)).fetchall()
+        return IRacingRaceResult.from_rows(rows, cust_id)
+
+    def get_sync_state(self, cust_id):
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT synced_through FROM iracing_sync_state WHERE cust_id = ?',
+                               (cust_id,)).fetchone()
+        return None if row is None else datetime.fromisoformat(row[0])
+
+    def set_sync_state(self, cust_id, synced_through):
+        with self.pool.connection() as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO iracing_sync_state (cust_id, synced_through) VALUES (?, ?)',
+                         (cust_id, synced_through.isoformat()))
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,92 @@
+import heapq
+import json
+
+
+def combine(function, value, other):
+    # MIN/MAX w SQL pomijają NULL - tutaj też brak wartości nie zastępuje istniejącej
+    if value is None:
+        return other
+    if other is None:
+        return value
+    return function(value, other)
+
+
+def average(total, count):
+    return total / count if count else None
+
+
+class ResultSummary:
+    # Podsumowanie wyników jednego auta albo toru w grze - liczniki, sumy i skrajne wartości zmieniają się
+    # przy każdym zapisie, więc ekran statystyk nie musi czytać tabeli results
+    recent_size = 10
+    __slots__ = ("races_count", "incidents_races", "incidents_sum", "incidents_min", "incidents_max",
+                 "positions_races", "position_sum", "position_min", "position_max", "recent")
+
+    def __init__(self, races_count=0, incidents_races=0, incidents_sum=0, incidents_min=None, incidents_max=None,
+                 positions_races=0, position_sum=0, position_min=None, position_max=None, recent=()):
+        self.races_count = races_count
+        # Starsze wiersze mogą nie mieć incydentów albo pozycji - średnie liczymy jak AVG, bez NULL
+        self.incidents_races = incidents_races
+        self.incidents_sum = incidents_sum
+        self.incidents_min = incidents_min
+        self.incidents_max = incidents_max
+        self.positions_races = positions_races
+        self.position_sum = position_sum
+        self.position_min = position_min
+        self.position_max = position_max
+        # Ostatnie wyścigi jako (created_at, id, incydenty, pozycja), od najnowszego
+        self.recent = [tuple(entry) for entry in recent]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row[:-1], recent=json.loads(row[-1]))
+
+    def row(self):
+        self.trim_recent()
+        return (self.races_count, self.incidents_races, self.incidents_sum, self.incidents_min, self.incidents_max,
+                self.positions_races, self.position_sum, self.position_min, self.position_max,
+                json.dumps(self.recent))
+
+    @classmethod
+    def from_entries(cls, entries):
+        # Wpisy (created_at, id, incydenty, pozycja) zbierane przy zapisie - sumy i skrajne wartości liczymy
+        # raz dla całej paczki, wbudowanymi funkcjami, a nie osobno dla każdego wyniku
+        incidents = [entry[2] for entry in entries if entry[2] is not None]
+        positions = [entry[3] for entry in entries if entry[3] is not None]
+        # Krotki porównują się po dacie, a przy równej dacie po unikalnym id
+        return cls(len(entries), len(incidents), sum(incidents), min(incidents, default=None),
+                   max(incidents, default=None), len(positions), sum(positions), min(positions, default=None),
+                   max(positions, default=None), heapq.nlargest(cls.recent_size, entries))
+
+    def merge(self, other):
+        self.races_count += other.races_count
+        self.incidents_races += other.incidents_races
+        self.incidents_sum += other.incidents_sum
+        self.incidents_min = combine(min, self.incidents_min, other.incidents_min)
+        self.incidents_max = combine(max, self.incidents_max, other.incidents_max)
+        self.positions_races += other.positions_races
+        self.position_sum += other.position_sum
+        self.position_min = combine(min, self.position_min, other.position_min)
+        self.position_max = combine(max, self.position_max, other.position_max)
+        self.recent.extend(other.recent)
+        self.trim_recent()
+
+    def trim_recent(self):
+        self.recent.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+        del self.recent[self.recent_size:]
+
+    def stats(self):
+        self.trim_recent()
+        recent_incidents = [entry[2] for entry in self.recent if entry[2] is not None]
+        recent_positions = [entry[3] for entry in self.recent if entry[3] is not None]
+        return {
+            "races_count": self.races_count,
+            "avg_incidents": average(self.incidents_sum, self.incidents_races),
+            "avg_position": average(self.position_sum, self.positions_races),
+            "min_incidents": self.incidents_min,
+            "max_incidents": self.incidents_max,
+            "best_position": self.position_min,
+            "worst_position": self.position_max,
+            "recent_avg_incidents": average(sum(recent_incidents), len(recent_incidents)),
+            "recent_avg_position": average(sum(recent_positions), len(recent_positions)),
+        }
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+# Testy GUI bez ekranu i bez systemowego pęku kluczy
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("PYTHON_KEYRING_BACKEND", "keyring.backends.null.Keyring")
+
+
+@pytest.fixture(scope="session")
+def qt_application():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,71 @@
+import functools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from simracing_core import IRacingSession
+
+
+class FakeIRacingClient:
+    # Zamiast irDataClient - te same metody i kształt odpowiedzi, dane generowane lokalnie
+    def __init__(self, username=None, password=None, races=100, sessions=5000, seed=7, latency=0.0):
+        self.authenticated = True
+        self.rate_limit = None
+        self.races = races
+        # Czas odpowiedzi serwera - bez niego pomiary równoległych zapytań nie mają czego nakładać
+        self.latency = latency
+        self.sessions = sessions
+        self.random = random.Random(seed)
+
+    def race_payload(self, index, start_time):
+        return {
+            "subsession_id": 50000000 + index,
+            "series_id": self.random.choice((34, 45, 63, 74, 102, 228)),
+            "series_name": f"Series {index % 40}",
+            "session_start_time": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "end_time": (start_time + timedelta(minutes=40)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "starting_position": self.random.randint(1, 24),
+            "finish_position": self.random.randint(1, 24),
+            "track": {"track_id": index % 150, "track_name": f"Track {index % 150}"},
+            "incidents": self.random.randint(0, 12),
+            "champ_points": self.random.randint(0, 150),
+            "event_strength_of_field": self.random.randint(800, 4000),
+            "oldi_rating": 2000,
+            "newi_rating": 2000 + self.random.randint(-80, 80),
+            "laps_led": self.random.randint(0, 5),
+            "car_id": self.random.choice((1, 67, 132, 157, 169, 173, 176, 9999)),
+        }
+
+    def stats_member_recent_races(self, cust_id=None):
+        time.sleep(self.latency)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        return {"cust_id": cust_id, "races": [self.race_payload(index, start + timedelta(hours=index))
+                                              for index in range(self.races)]}
+
+    def result_search_series(self, cust_id=None, finish_range_begin=None, finish_range_end=None, **params):
+        return [self.race_payload(index, finish_range_begin + timedelta(hours=index)) for index in range(self.races)]
+
+    def season_race_guide(self):
+        start = datetime.now(timezone.utc).replace(microsecond=0)
+        sessions = []
+        for index in range(self.sessions):
+            session_start = start + timedelta(minutes=self.random.randint(-60, 24 * 60))
+            sessions.append({
+                "season_id": 4000 + index % 200,
+                "series_id": self.random.choice((34, 45, 63, 74, 102, 228)),
+                "race_week_num": index % 12,
+                "start_time": session_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "end_time": (session_start + timedelta(minutes=45)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "entry_count": self.random.randint(0, 60),
+            })
+        return {"sessions": sessions}
+
+    def get_cars(self):
+        return [{"car_id": car_id, "car_name": f"Car {car_id}"} for car_id in range(1, 200)]
+
+    def get_series(self):
+        return [{"series_id": series_id, "series_name": f"Series {series_id}"} for series_id in range(1, 600)]
+
+
+def fake_session(**client_options):
+    return IRacingSession(client_factory=functools.partial(FakeIRacingClient, **client_options))
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def executor(qt_application):
+    from main import ApiTaskExecutor
+
+    executor = ApiTaskExecutor()
+    yield executor
+    executor.cancel_all()
+    assert ApiTaskExecutor.thread_pool.waitForDone(2000)
+
+
+def process_events_until(qt_application, condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        qt_application.processEvents()
+        time.sleep(0.005)
+    return condition()
+
+
+def test_finished_task_delivers_result(qt_application, executor):
+    results = []
+    executor.submit("task", lambda cancelled: 42, results.append, results.append)
+    assert process_events_until(qt_application, lambda: results)
+    assert results == [42]
+
+
+def test_cancelled_task_is_told_to_stop_and_its_result_is_dropped(qt_application, executor):
+    started = threading.Event()
+    release = threading.Event()
+    observed = []
+
+    def fetch(cancelled):
+        started.set()
+        release.wait(2)
+        observed.append(cancelled.is_set())
+        return "wynik"
+
+    delivered = []
+    executor.submit("task", fetch, delivered.append, delivered.append)
+    assert started.wait(2)
+    executor.cancel("task")
+    release.set()
+    assert executor.thread_pool.waitForDone(2000)
+    process_events_until(qt_application, lambda: delivered, timeout=0.2)
+    assert observed == [True]
+    assert delivered == []
+
+
+def test_replaced_task_result_is_dropped(qt_application, executor):
+    release = threading.Event()
+    delivered = []
+    executor.submit("task", lambda cancelled: release.wait(2) and "stary", delivered.append, delivered.append)
+    executor.submit("task", lambda cancelled: "nowy", delivered.append, delivered.append)
+    release.set()
+    assert process_events_until(qt_application, lambda: delivered)
+    assert executor.thread_pool.waitForDone(2000)
+    process_events_until(qt_application, lambda: len(delivered) > 1, timeout=0.2)
+    assert delivered == ["nowy"]
+
+
+def test_timeout_reports_error_and_cancels_fetch(qt_application, executor):
+    failures = []
+    successes = []
+    stopped = threading.Event()
+
+    def fetch(cancelled):
+        # Zachowuje się jak synchronizacja historii - kończy się, gdy tylko zauważy anulowanie
+        if cancelled.wait(5):
+            stopped.set()
+        return "wynik"
+
+    executor.submit("task", fetch, successes.append, failures.append, timeout=0.05)
+    assert process_events_until(qt_application, lambda: failures)
+    assert isinstance(failures[0], TimeoutError)
+    assert stopped.wait(1)
+    assert executor.thread_pool.waitForDone(2000)
+    process_events_until(qt_application, lambda: successes, timeout=0.2)
+    assert successes == []
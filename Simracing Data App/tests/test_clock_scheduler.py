@@ -0,0 +1,28 @@
+import shiboken6
+from PySide6.QtWidgets import QLabel, QVBoxLayout, QWidget
+
+from main import ClockScheduler
+
+
+def test_minimized_window_sleeps_until_restored(qt_application):
+    scheduler = ClockScheduler()
+    window = QWidget()
+    label = QLabel(window)
+    QVBoxLayout(window).addWidget(label)
+    def refresh():
+        pass
+    scheduler.subscribe(label, refresh)
+    window.show()
+    qt_application.processEvents()
+    assert scheduler.is_active(label) and scheduler.timer.isActive()
+
+    window.showMinimized()
+    qt_application.processEvents()
+    assert not scheduler.is_active(label) and not scheduler.timer.isActive()
+
+    window.showNormal()
+    assert scheduler.is_active(label) and scheduler.timer.isActive()
+    # Przywrócone okno dostaje tyknięcie od razu, a nie dopiero przy następnej pełnej sekundzie
+    assert scheduler.ticks[(label, refresh)][1] == 0.0
+    shiboken6.delete(window)
+    assert not scheduler.watched_widgets and not scheduler.ticks
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from simracing_core import DataStorage
+from simracing_core.importer import ResultImporter
+
+
+@pytest.fixture
+def data_storage(tmp_path):
+    data_storage = DataStorage(str(tmp_path / "data.db"))
+    yield data_storage
+    data_storage.close()
+
+
+def result(created_at="2024-03-01 18:00:00", **values):
+    return {"created_at": created_at, "car_model": "BMW M4 GT3", "track_name": "Monza", "incidents_count": 2,
+            "position_in_race": 5, **values}
+
+
+def write_jsonl(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def stored_rows(data_storage):
+    with data_storage.pool.connection() as conn:
+        return conn.execute('SELECT created_at, car_model, position_in_race FROM results ORDER BY id').fetchall()
+
+
+def test_malformed_jsonl_line_is_reported_and_other_lines_are_imported(data_storage, tmp_path):
+    path = write_jsonl(tmp_path / "results.jsonl", [json.dumps(result()), '{"car_model": "Audi R8", ',
+                                                     json.dumps(result("2024-03-02 18:00:00"))])
+    report = ResultImporter(data_storage).import_file(path)
+    assert (report.read_rows, report.imported_rows, report.invalid_rows) == (3, 2, 1)
+    assert report.errors[0][0] == 2
+
+
+def test_infinite_and_out_of_range_numbers_are_invalid_rows(data_storage, tmp_path):
+    path = tmp_path / "results.csv"
+    path.write_text("created_at,car_model,track_name,incidents_count,position_in_race\n"
+                    "2024-03-01 18:00:00,BMW M4 GT3,Monza,inf,5\n"
+                    "2024-03-01 19:00:00,BMW M4 GT3,Monza,1,nan\n"
+                    "2024-03-01 20:00:00,BMW M4 GT3,Monza,1,1e30\n"
+                    "2024-03-01 21:00:00,BMW M4 GT3,Monza,1,3.0\n", encoding="utf-8")
+    report = ResultImporter(data_storage).import_file(str(path))
+    assert (report.imported_rows, report.invalid_rows) == (1, 3)
+    assert stored_rows(data_storage) == [("2024-03-01 21:00:00", "BMW M4 GT3", 3)]
+
+
+def test_json_infinity_is_an_invalid_row(data_storage, tmp_path):
+    path = write_jsonl(tmp_path / "results.jsonl", ['{"created_at": "2024-03-01 18:00:00", "car_model": "BMW", '
+                                                    '"track_name": "Monza", "incidents_count": 1e400}'])
+    report = ResultImporter(data_storage).import_file(path)
+    assert (report.imported_rows, report.invalid_rows) == (0, 1)
+
+
+def test_truncated_json_array_keeps_rows_read_before_the_error(data_storage, tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps([result(), result("2024-03-02 18:00:00")])[:-20], encoding="utf-8")
+    report = ResultImporter(data_storage).import_file(str(path))
+    assert (report.imported_rows, report.invalid_rows) == (1, 1)
+
+
+def test_rows_without_date_are_rejected(data_storage, tmp_path):
+    path = write_jsonl(tmp_path / "results.jsonl", [json.dumps(result(created_at="")),
+                                                    json.dumps({**result(), "created_at": None})])
+    for _ in range(2):
+        report = ResultImporter(data_storage).import_file(path)
+        assert (report.imported_rows, report.invalid_rows) == (0, 2)
+    assert stored_rows(data_storage) == []
+
+
+def test_repeated_races_in_one_file_are_kept_and_reimport_adds_nothing(data_storage, tmp_path):
+    path = write_jsonl(tmp_path / "results.jsonl", [json.dumps(result()), json.dumps(result()),
+                                                    json.dumps(result("2024-03-02 18:00:00"))])
+    report = ResultImporter(data_storage).import_file(path)
+    assert (report.imported_rows, report.duplicate_rows) == (3, 0)
+    report = ResultImporter(data_storage, chunk_size=1).import_file(path)
+    assert (report.imported_rows, report.duplicate_rows) == (0, 3)
+    assert len(stored_rows(data_storage)) == 3
+    assert data_storage.stats_by_car()[0]["races_count"] == 3
+
+
+def test_file_with_more_copies_than_stored_adds_only_the_difference(data_storage, tmp_path):
+    ResultImporter(data_storage).import_file(write_jsonl(tmp_path / "one.jsonl", [json.dumps(result())]))
+    path = write_jsonl(tmp_path / "two.jsonl", [json.dumps(result()), json.dumps(result())])
+    report = ResultImporter(data_storage).import_file(path)
+    assert (report.imported_rows, report.duplicate_rows) == (1, 1)
+    assert len(stored_rows(data_storage)) == 2
+
+
+def test_field_strength_outside_form_range_is_an_invalid_row(data_storage, tmp_path):
+    path = write_jsonl(tmp_path / "results.jsonl", [json.dumps(result(field_strength=-1500)),
+                                                    json.dumps(result("2024-03-02 18:00:00", field_strength=20001)),
+                                                    json.dumps(result("2024-03-03 18:00:00", field_strength=2000))])
+    report = ResultImporter(data_storage).import_file(path)
+    assert (report.imported_rows, report.invalid_rows) == (1, 2)
+    assert stored_rows(data_storage) == [("2024-03-03 18:00:00", "BMW M4 GT3", 5)]
@@ -0,0 +1,83 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from simracing_core import DataStorage, IRacingDataFetcher, IRacingHistorySync, IRacingSession
+from tests.fakes import FakeIRacingClient
+
+
+class FlakyClient(FakeIRacingClient):
+    # Pierwsze zapytania kończą się podanymi błędami, kolejne zwracają dane
+    def __init__(self, errors, **options):
+        super().__init__(**options)
+        self.errors = list(errors)
+        self.calls = 0
+
+    def stats_member_recent_races(self, cust_id=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().stats_member_recent_races(cust_id)
+
+
+def session_with(client, **options):
+    return IRacingSession(client_factory=lambda username, password: client, backoff_seconds=0, **options)
+
+
+def test_connection_errors_are_retried():
+    client = FlakyClient([ConnectionError("reset"), OSError("timeout")], races=3)
+    data = session_with(client).call("stats_member_recent_races", cust_id=1)
+    assert len(data["races"]) == 3
+    assert client.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    client = FlakyClient([OSError("timeout")] * 3)
+    with pytest.raises(OSError):
+        session_with(client, max_retries=3).call("stats_member_recent_races", cust_id=1)
+    assert client.calls == 3
+
+
+def test_transient_runtime_error_is_retried_and_other_errors_are_not():
+    client = FlakyClient([RuntimeError("Connection error")], races=1)
+    session_with(client).call("stats_member_recent_races", cust_id=1)
+    assert client.calls == 2
+
+    client = FlakyClient([RuntimeError("Unhandled Non-200 response")])
+    with pytest.raises(RuntimeError):
+        session_with(client).call("stats_member_recent_races", cust_id=1)
+    assert client.calls == 1
+
+
+def test_waits_for_rate_limit_reset_before_calling():
+    client = FlakyClient([], races=1)
+    client.rate_limit = SimpleNamespace(has_data=True, remaining=0, reset=time.time() + 0.3)
+    started_at = time.monotonic()
+    session_with(client).call("stats_member_recent_races", cust_id=1)
+    assert time.monotonic() - started_at >= 0.25
+    assert client.calls == 1
+
+
+def test_cancelled_sync_stops_after_current_window(tmp_path):
+    cancelled = threading.Event()
+
+    class CancellingClient(FakeIRacingClient):
+        windows = 0
+
+        def result_search_series(self, **params):
+            CancellingClient.windows += 1
+            cancelled.set()
+            return super().result_search_series(**params)
+
+    data_storage = DataStorage(str(tmp_path / "data.db"))
+    try:
+        session = IRacingSession(client_factory=lambda username, password: CancellingClient(races=2))
+        history_sync = IRacingHistorySync(IRacingDataFetcher(session), data_storage)
+        assert history_sync.sync(1, cancelled) == 2
+        assert CancellingClient.windows == 1
+        # Następna synchronizacja wznowi się od końca pierwszego okna
+        assert data_storage.get_sync_state(1) == IRacingHistorySync.history_start + IRacingHistorySync.window
+    finally:
+        data_storage.close()
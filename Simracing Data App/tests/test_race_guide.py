@@ -0,0 +1,45 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from simracing_core import RaceGuideIndex, TimeConverter
+
+
+def sessions(count, seed=3):
+    generator = random.Random(seed)
+    start = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    result = []
+    for index in range(count):
+        session_start = start + timedelta(minutes=generator.randint(-60, 6 * 60))
+        result.append({"series_id": index % 7, "race_week_num": 0, "entry_count": 10,
+                       "start_time": session_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                       "end_time": (session_start + timedelta(minutes=generator.randint(15, 120)))
+                       .strftime("%Y-%m-%dT%H:%M:%SZ")})
+    return result
+
+
+def next_window_change_by_scan(index, now, seconds):
+    times = [start for start in index.starts if start > now]
+    times += [start - seconds for start in index.starts if start >= now + seconds]
+    times += [end - seconds for end in index.ends if end > now + seconds]
+    return float(min(times)) if times else None
+
+
+def test_next_window_change_matches_full_scan():
+    index = RaceGuideIndex(sessions(500), TimeConverter("UTC"))
+    start = datetime(2024, 5, 1, 11, tzinfo=timezone.utc).timestamp()
+    for offset in range(0, 8 * 3600, 617):
+        for seconds in (60, 15 * 60, 2 * 3600):
+            now = start + offset
+            assert index.next_window_change(now, seconds) == next_window_change_by_scan(index, now, seconds)
+
+
+def test_next_window_change_after_last_session_is_none():
+    index = RaceGuideIndex(sessions(20), TimeConverter("UTC"))
+    assert index.next_window_change(float(index.ends.max()) + 1, 60) is None
+
+
+def test_next_window_change_sees_a_session_ending_inside_the_window():
+    index = RaceGuideIndex(sessions(1), TimeConverter("UTC"))
+    start, end = float(index.starts[0]), float(index.ends[0])
+    # Sesja już trwa - lista "koniec w ciągu" zmieni się, gdy jej koniec wejdzie w okno
+    assert index.next_window_change(start + 1, 60) == end - 60
@@ -0,0 +1,39 @@
+import csv
+import random
+
+import numpy as np
+
+from simracing_core import WorldRanking
+
+
+def ranking(tmp_path, names):
+    path = tmp_path / "ranking.csv"
+    with open(path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["DRIVER", "IRATING", "AVG_INC", "AVG_FINISH_POS"])
+        # iRating malejący z kolejnością w pliku - miejsce w rankingu to indeks nazwy
+        for index, name in enumerate(names):
+            writer.writerow([name, 10000 - index, 1.0, 1.0])
+    return WorldRanking(str(path), str(tmp_path / "cache")).load()
+
+
+def test_substring_match_hidden_by_match_across_names(tmp_path):
+    world_ranking = ranking(tmp_path, ["ab", "abab"])
+    assert world_ranking.search_names("abab", substring=True).tolist() == [1]
+    assert world_ranking.search_names("abab").tolist() == [1]
+
+
+def test_substring_search_matches_plain_scan(tmp_path):
+    generator = random.Random(5)
+    names = ["".join(generator.choice("abł") for _ in range(generator.randint(1, 6))) for _ in range(300)]
+    world_ranking = ranking(tmp_path, names)
+    for needle in ("a", "ab", "aba", "bab", "abab", "łab", "bb", "ababa"):
+        expected = [index for index, name in enumerate(names) if needle in name]
+        assert world_ranking.search_names(needle, substring=True).tolist() == expected, needle
+
+
+def test_substring_search_returns_index_array(tmp_path):
+    world_ranking = ranking(tmp_path, ["Max Verstappen", "Lando Norris"])
+    result = world_ranking.search_names("NORR", substring=True)
+    assert result.dtype == np.int64 and result.tolist() == [1]
+    assert world_ranking.search_names("zzz", substring=True).tolist() == []
@@ -0,0 +1,17 @@
+import pytest
+
+from simracing_core import RatingEngine
+
+
+def test_update_rates_the_same_races_as_recompute():
+    engine = RatingEngine()
+    field_strengths = [2000, 0, -1500, None, 1800]
+    positions = [3, 1, 1, 2, 7]
+    incidents_counts = [0, 4, 2, 1, 0]
+    state = engine.initial_state()
+    for field_strength, position, incidents_count in zip(field_strengths, positions, incidents_counts):
+        state = engine.update(state, field_strength, position, incidents_count)
+    recomputed = engine.recompute([value or 0 for value in field_strengths], positions, incidents_counts)
+    assert state.skill == pytest.approx(recomputed.skill)
+    assert state.safety == pytest.approx(recomputed.safety)
+    assert state.races_count == recomputed.races_count
@@ -0,0 +1,87 @@
+import sqlite3
+
+from simracing_core import DataStorage
+
+
+def legacy_database(path, rows):
+    # Tabela results w postaci sprzed wersjonowania schematu - kolumny mogą być puste
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (car_model TEXT, incidents_count INTEGER, position_in_race INTEGER, "
+                 "track_name TEXT)")
+    conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def table_text(view):
+    model = view.model()
+    return [[model.data(model.index(row, column)) for column in range(model.columnCount())]
+            for row in range(model.rowCount())]
+
+
+def test_car_without_incidents_or_positions_shows_empty_averages(qt_application, tmp_path):
+    from main import StatsWindow
+
+    path = str(tmp_path / "data.db")
+    legacy_database(path, [("Formula Renault", None, None, "Monza"), ("Formula Renault", None, None, "Spa"),
+                           ("BMW M4 GT3", 2, 5, "Monza")])
+    data_storage = DataStorage(path)
+    try:
+        stats_window = StatsWindow(data_storage)
+        rows = {row[0]: row for row in table_text(stats_window.car_stats_table)}
+        assert rows["Formula Renault"] == ["Formula Renault", "2", "", ""]
+        assert rows["BMW M4 GT3"] == ["BMW M4 GT3", "1", "2.00", "5.00"]
+    finally:
+        data_storage.close()
+
+
+def test_car_without_model_name(qt_application, tmp_path):
+    from main import StatsWindow
+
+    path = str(tmp_path / "data.db")
+    legacy_database(path, [(None, None, None, None)])
+    data_storage = DataStorage(path)
+    try:
+        stats_window = StatsWindow(data_storage)
+        assert table_text(stats_window.car_stats_table) == [["", "1", "", ""]]
+    finally:
+        data_storage.close()
+
+
+def test_reopening_stats_window_reuses_count_and_first_page(qt_application, tmp_path):
+    from main import StatsWindow
+    from simracing_core import RaceResult
+
+    data_storage = DataStorage(str(tmp_path / "data.db"))
+    try:
+        data_storage.insert_results([RaceResult(created_at="2024-03-01 18:00:00", car_model="BMW M4 GT3",
+                                                track_name="Monza", incidents_count=2, position_in_race=5)])
+        StatsWindow(data_storage)
+        queries = []
+        for name in ("query_count_results", "query_results_page"):
+            query = getattr(data_storage, name)
+            setattr(data_storage, name,
+                    lambda *args, name=name, query=query, **kwargs: queries.append(name) or query(*args, **kwargs))
+
+        assert StatsWindow(data_storage).results_table.model().total_rows == 1
+        assert queries == []
+        data_storage.insert_results([RaceResult(created_at="2024-03-02 18:00:00", car_model="BMW M4 GT3",
+                                                track_name="Spa", incidents_count=0, position_in_race=1)])
+        assert StatsWindow(data_storage).results_table.model().total_rows == 2
+        assert "query_count_results" in queries
+    finally:
+        data_storage.close()
+
+
+def test_results_pages_sorted_by_any_column_use_an_index(tmp_path):
+    data_storage = DataStorage(str(tmp_path / "data.db"))
+    try:
+        with data_storage.pool.connection() as conn:
+            for column in DataStorage.results_sort_columns:
+                plan = " ".join(row[-1] for row in conn.execute(f'''
+                    EXPLAIN QUERY PLAN SELECT id FROM results WHERE game = ? AND ({column}, id) < (?, ?)
+                    ORDER BY {column} DESC, id DESC LIMIT 200
+                ''', ("Project Cars 2", 1, 1)))
+                assert "TEMP B-TREE" not in plan, (column, plan)
+    finally:
+        data_storage.close()